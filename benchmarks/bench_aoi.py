@@ -0,0 +1,76 @@
+"""AOI preparation: per-row apply + GeoJSON scans vs the vectorised oneatlas.aoi stage
+
+The old path is quadratic in the number of sites, so it is timed on a sample
+and the new path on the full layer. Run from the repo root with
+`python -m benchmarks.bench_aoi`.
+"""
+
+import argparse
+import json
+import time
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from oneatlas.aoi import aoi_index, iter_search_bodies, points_to_buffer_box
+
+
+def synthetic_sites(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Points scattered over Scotland in British National Grid
+    x = rng.uniform(100000, 450000, n)
+    y = rng.uniform(550000, 1000000, n)
+    return gpd.GeoDataFrame(
+        {"image_id": np.arange(1, n + 1)},
+        geometry=gpd.points_from_xy(x, y),
+        crs="EPSG:27700",
+    )
+
+
+def old_prepare(gdf, buffer_distance):
+    """The previous download_images_batch code path, as it was"""
+    gdf = gdf.to_crs(epsg=27700)
+    gdf["geometry"] = gdf.geometry.buffer(buffer_distance)
+    gdf["geometry"] = gdf.geometry.apply(lambda geom: box(*geom.bounds))
+    json_str = gdf[["image_id", "geometry"]].to_crs(epsg=4326).to_json(drop_id=True)
+    geojson, id_vals = json.loads(json_str), gdf["image_id"].tolist()
+    for search_id in id_vals:
+        if search_id not in id_vals:
+            raise ValueError
+        for feature in geojson["features"]:
+            if feature["properties"]["image_id"] == search_id:
+                break
+
+
+def new_prepare(gdf, buffer_distance):
+    gdf = points_to_buffer_box(gdf, buffer_distance=buffer_distance)
+    index = aoi_index(gdf, uid_column="image_id")
+    for _ in iter_search_bodies(index):
+        pass
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(n=100000, old_n=5000, buffer_distance=1000):
+    old = timed(old_prepare, synthetic_sites(old_n), buffer_distance)
+    new_small = timed(new_prepare, synthetic_sites(old_n), buffer_distance)
+    new = timed(new_prepare, synthetic_sites(n), buffer_distance)
+    print(f"old path, {old_n:>7} sites: {old:8.2f}s")
+    print(f"new path, {old_n:>7} sites: {new_small:8.2f}s")
+    print(f"new path, {n:>7} sites: {new:8.2f}s")
+    print(
+        f"old path, {n:>7} sites: ~{old * (n / old_n) ** 2:7.0f}s (quadratic estimate)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AOI preparation.")
+    parser.add_argument("-n", type=int, default=100000, help="Number of sites.")
+    parser.add_argument("--old_n", type=int, default=5000, help="Sites for old path.")
+    args = parser.parse_args()
+    main(n=args.n, old_n=args.old_n)
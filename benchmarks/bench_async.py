@@ -0,0 +1,65 @@
+"""AsyncOneAtlasClient against the stub server, compared with threaded blocking calls
+
+Also exercises the async search, order listing and download paths end to end.
+Run from the repo root with `python -m benchmarks.bench_async`.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from oneatlas import OneAtlasClient
+from oneatlas.aio import AsyncOneAtlasClient
+from benchmarks.stub_server import StubHandler, start_server, point_client_at
+
+
+def bench_threads(base_url, n, workers):
+    with point_client_at(
+        OneAtlasClient(api_key="stub", pool_maxsize=workers), base_url
+    ) as client:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(client.get_order, range(n)))
+        return n / (time.perf_counter() - start)
+
+
+async def bench_async(base_url, n, concurrency):
+    client = point_client_at(
+        AsyncOneAtlasClient(api_key="stub", max_concurrency=concurrency), base_url
+    )
+    async with client:
+        # Check the rest of the surface works against the stub
+        await client.search({"bbox": "0,0,1,1"})
+        await client.list_orders(customerRef="ref")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "download.zip"
+            await client.download_url_to_file(f"{base_url}/download/1000000", path)
+            assert path.stat().st_size == 1000000
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client.get_order(i) for i in range(n)))
+        return n / (time.perf_counter() - start)
+
+
+def main(n=2000, latency=0.05, workers=16, concurrency=200):
+    handler = type("SlowHandler", (StubHandler,), {"latency": latency})
+    server, base_url = start_server(handler)
+    threaded = bench_threads(base_url, n, workers)
+    concurrent = asyncio.run(bench_async(base_url, n, concurrency))
+    server.shutdown()
+    print(f"{n} requests, {latency * 1000:.0f} ms simulated API latency")
+    print(f"{workers} threads, blocking client: {threaded:8.0f} req/s")
+    print(f"asyncio, {concurrency} in flight:   {concurrent:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio client.")
+    parser.add_argument("-n", type=int, default=2000, help="Number of requests.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds.")
+    parser.add_argument("--workers", type=int, default=16, help="Threads.")
+    parser.add_argument("--concurrency", type=int, default=200, help="In flight.")
+    args = parser.parse_args()
+    main(args.n, args.latency, args.workers, args.concurrency)
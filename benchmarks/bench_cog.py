@@ -0,0 +1,77 @@
+"""Reduced-scale reads from a plain delivery tif against its COG
+
+Writes a --pixels square, uncompressed, striped 3-band tif (the layout of an
+extracted delivery), converts it with to_cog and times a page-sized read of
+each, as images_to_pdf does. Run from the repo root with
+`python -m benchmarks.bench_cog`.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from images_to_pdf import read_for_page
+from oneatlas.raster import to_cog
+
+
+def write_delivery(path, pixels):
+    """Smooth gradients plus noise, written a block of rows at a time"""
+    rng = np.random.default_rng(0)
+    profile = dict(
+        driver="GTiff",
+        width=pixels,
+        height=pixels,
+        count=3,
+        dtype="uint8",
+        crs="EPSG:32630",
+        transform=from_origin(400000, 6300000, 0.5, 0.5),
+    )
+    x = np.linspace(0, 8 * np.pi, pixels)
+    with rasterio.open(path, "w", **profile) as dst:
+        for row in range(0, pixels, 1024):
+            rows = min(1024, pixels - row)
+            y = np.linspace(row, row + rows, rows)[:, None] / pixels * 8 * np.pi
+            base = 100 + 60 * np.sin(x)[None, :] * np.cos(y)
+            block = base + rng.normal(0, 8, (3, rows, pixels))
+            window = rasterio.windows.Window(0, row, pixels, rows)
+            dst.write(np.clip(block, 0, 255).astype("uint8"), window=window)
+
+
+def timed_read(path, max_pixels, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        read_for_page(path, max_pixels)
+    return (time.perf_counter() - start) / repeats
+
+
+def main(pixels=10000, page_pixels=1800):
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Path(tmp) / "delivery.tif"
+        cog = Path(tmp) / "delivery_cog.tif"
+        write_delivery(plain, pixels)
+
+        start = time.perf_counter()
+        to_cog(plain, cog)
+        convert = time.perf_counter() - start
+
+        plain_read = timed_read(plain, page_pixels)
+        cog_read = timed_read(cog, page_pixels)
+        mb = 1024 * 1024
+        print(f"{pixels}x{pixels} px, 3 bands, read at {page_pixels} px")
+        print(f"conversion: {convert:.1f}s")
+        print(f"plain tif: {plain.stat().st_size / mb:8.1f} MB, read {plain_read:.3f}s")
+        print(f"COG:       {cog.stat().st_size / mb:8.1f} MB, read {cog_read:.3f}s")
+        print(f"read speedup {plain_read / cog_read:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pixels", type=int, default=10000)
+    parser.add_argument("--page_pixels", type=int, default=1800)
+    args = parser.parse_args()
+    main(args.pixels, args.page_pixels)
@@ -0,0 +1,51 @@
+"""Download throughput at various segment counts against a range-capable stub
+
+Each stub connection is throttled to --rate MB/s to mimic a per-connection cap.
+Run from the repo root with `python -m benchmarks.bench_download`.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from oneatlas import OneAtlasClient
+from benchmarks.stub_server import StubHandler, start_server, point_client_at
+
+
+def main(size_mb=64, rate_mb=50, segment_counts=(1, 2, 4, 8)):
+    handler = type("ThrottledHandler", (StubHandler,), {})
+    handler.download_rate = rate_mb * 1024 * 1024 if rate_mb else None
+    server, base_url = start_server(handler)
+    size = size_mb * 1024 * 1024
+    print(f"{size_mb} MB download, stub capped at {rate_mb} MB/s per connection")
+    with point_client_at(OneAtlasClient(api_key="stub"), base_url) as client:
+        with tempfile.TemporaryDirectory() as tmp:
+            for segments in segment_counts:
+                path = Path(tmp) / f"bench_{segments}.zip"
+                start = time.perf_counter()
+                client.download_url_to_file(
+                    f"{base_url}/download/{size}",
+                    path,
+                    segments=segments,
+                    expected_size=size,
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    f"segments={segments:2d}: {size_mb / elapsed:8.1f} MB/s ({elapsed:.2f}s)"
+                )
+                path.unlink()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ranged downloads.")
+    parser.add_argument("--size", type=int, default=256, help="File size in MB.")
+    parser.add_argument(
+        "--rate", type=float, default=50, help="Per-connection MB/s (0 = no cap)."
+    )
+    parser.add_argument(
+        "--segments", type=int, nargs="+", default=[1, 2, 4, 8], help="Segment counts."
+    )
+    args = parser.parse_args()
+    main(size_mb=args.size, rate_mb=args.rate, segment_counts=args.segments)
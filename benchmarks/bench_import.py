@@ -0,0 +1,66 @@
+"""Import time of the client and batch script, and which heavy modules they load
+
+Each import runs in a fresh interpreter under `python -X importtime`, best of
+--repeat runs. Exits non-zero if `import oneatlas` is over --budget_ms or
+loads any of HEAVY, so plotting or geospatial imports creeping back in to the
+client's import path show up here. Run from the repo root with
+`python -m benchmarks.bench_import`.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+
+# Only needed for plotting or geospatial stages, never to make API calls
+HEAVY = ("matplotlib", "PIL", "numpy", "geopandas", "shapely", "rasterio", "pyproj")
+
+TARGETS = ("oneatlas", "oneatlas.oneatlas", "download_images_batch")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module):
+    """(cumulative ms of the import, set of top-level packages loaded)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        loaded.add(name.split(".")[0])
+        if name == module and len(indent) == 1:
+            total_us = int(cumulative)
+    return total_us / 1000, loaded
+
+
+def main(budget_ms=400, repeat=5):
+    ok = True
+    for module in TARGETS:
+        profiles = [import_profile(module) for _ in range(repeat)]
+        ms = min(ms for ms, _ in profiles)
+        heavy = sorted(set(HEAVY) & profiles[0][1])
+        print(f"import {module:24} {ms:8.1f} ms  heavy: {', '.join(heavy) or '-'}")
+        if module == "oneatlas":
+            if ms > budget_ms:
+                print(f"  over budget of {budget_ms} ms")
+                ok = False
+            if heavy:
+                print("  should not load plotting or geospatial packages")
+                ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget_ms", type=float, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(0 if main(budget_ms=args.budget_ms, repeat=args.repeat) else 1)
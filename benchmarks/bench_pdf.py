@@ -0,0 +1,105 @@
+"""PDF rendering: full-resolution plots via temp PNGs against images_to_pdf
+
+Writes --scenes synthetic 3-band Pléiades-sized tifs (two per site) and times
+the notebook's original approach against pdf_per_image_id.
+Run from the repo root with `python -m benchmarks.bench_pdf`.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import rasterio as rio
+from matplotlib_scalebar.scalebar import ScaleBar
+from PIL import Image
+from rasterio.plot import show
+from rasterio.transform import from_origin
+from reportlab.lib.pagesizes import A3
+from reportlab.pdfgen import canvas
+
+from images_to_pdf import pdf_per_image_id
+from oneatlas.catalog import parse_image_name
+
+
+def write_scenes(folder, scenes, pixels):
+    rng = np.random.default_rng(0)
+    tile = rng.integers(0, 255, (3, 512, 512), dtype=np.uint8)
+    data = np.tile(tile, (1, pixels // 512 + 1, pixels // 512 + 1))
+    data = data[:, :pixels, :pixels]
+    for i in range(scenes):
+        path = folder / f"IMG_PHR1A_PMS_2023060{i % 9 + 1}1100000_{i // 2 + 1}.tif"
+        with rio.open(
+            path,
+            "w",
+            driver="GTiff",
+            width=pixels,
+            height=pixels,
+            count=3,
+            dtype="uint8",
+            crs="EPSG:32630",
+            transform=from_origin(400000, 6300000, 0.5, 0.5),
+            tiled=True,
+        ) as dst:
+            dst.write(data)
+
+
+def serial_full_resolution(images_folder, pdf_dir):
+    """The loop from images_to_pdf.ipynb, condensed"""
+    images = list(Path(images_folder).glob("*.tif"))
+    for image_id in {int(img.stem.split("_")[-1]) for img in images}:
+        selected = [img for img in images if int(img.stem.split("_")[-1]) == image_id]
+        selected.sort(key=lambda img: parse_image_name(img)[1], reverse=True)
+        c = canvas.Canvas(str(Path(pdf_dir) / f"serial_{image_id}.pdf"), pagesize=A3)
+        for selected_image in selected:
+            with rio.open(selected_image) as src:
+                fig, ax = plt.subplots(figsize=(18, 18))
+                ax.set_title(str(image_id), pad=20)
+                show(src, ax=ax, with_bounds=False)
+                ax.add_artist(ScaleBar(0.5, units="m", location="lower right"))
+                ax.set_axis_off()
+                temp_png_path = selected_image.with_suffix(".png")
+                plt.savefig(temp_png_path, dpi=100)
+                plt.close(fig)
+                with Image.open(temp_png_path) as img:
+                    img.size
+                c.drawImage(str(temp_png_path), 10, 10, width=800, height=800)
+                c.showPage()
+                temp_png_path.unlink()
+        c.save()
+
+
+def main(scenes=6, pixels=10000, workers=None):
+    sites = gpd.GeoDataFrame(
+        {"image_id": [1], "USER_Name_of_business": ["Quarry"]},
+        geometry=gpd.points_from_xy([0], [0]),
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        write_scenes(folder, scenes, pixels)
+        print(f"{scenes} scenes of {pixels}x{pixels} px, 3 bands")
+
+        start = time.perf_counter()
+        serial_full_resolution(folder, folder)
+        serial = time.perf_counter() - start
+        print(f"serial, full resolution: {serial:.1f}s")
+
+        start = time.perf_counter()
+        pdf_per_image_id(folder, folder, sites, workers=workers)
+        pooled = time.perf_counter() - start
+        print(f"pdf_per_image_id: {pooled:.1f}s ({serial / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=6)
+    parser.add_argument("--pixels", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.scenes, args.pixels, args.workers)
@@ -0,0 +1,141 @@
+"""End-to-end run of download_images_batch against the fake OneAtlas API
+
+Writes --sites synthetic sites and a config.json to a temporary folder, starts
+FakeOneAtlasHandler in a child process and runs the batch main() over every
+site: search, price, order, delivery, download and extract. Reports
+throughput, the API calls the server saw and the peak memory of the pipeline.
+Run from the repo root with `python -m benchmarks.bench_pipeline`.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+import download_images_batch
+from oneatlas import OneAtlasClient
+from benchmarks.bench_aoi import synthetic_sites
+from benchmarks.stub_server import point_client_at, serve_in_process
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(
+    sites=2000,
+    workers=32,
+    delivery_delay=2.0,
+    latency=0.02,
+    error_rate=0.01,
+    failure_rate=0.0,
+    scene_pixels=256,
+    **batch_options,
+):
+    server, base_url = serve_in_process(
+        delivery_delay=delivery_delay,
+        latency=latency,
+        error_rate=error_rate,
+        failure_rate=failure_rate,
+        scene_pixels=scene_pixels,
+    )
+    # main() builds its own client, so point the class itself at the fake
+    point_client_at(OneAtlasClient, base_url)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        gdf = synthetic_sites(sites)
+        gdf["USER_Name_of_business"] = "Quarry " + gdf["image_id"].astype(str)
+        gdf.to_file(tmp / "sites.gpkg", layer="Registered_Sites_Merged_v2")
+        (tmp / "outputs").mkdir()
+        with open(tmp / "config.json", "w") as f:
+            json.dump(
+                {
+                    "api_key": "bench",
+                    "output_dir": str(tmp / "outputs"),
+                    "input_gdb": str(tmp / "sites.gpkg"),
+                },
+                f,
+            )
+
+        print(
+            f"{sites} sites, {workers} workers, delivery after {delivery_delay}s, "
+            f"{latency * 1000:.0f} ms latency, {error_rate:.1%} injected 503s"
+        )
+        baseline_mb = peak_rss_mb()
+        log_path = tmp / "batch.log"
+        os.chdir(tmp)
+        try:
+            start = time.perf_counter()
+            with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+                download_images_batch.main(
+                    workers=workers,
+                    max_searches=workers,
+                    max_orders=workers,
+                    max_downloads=workers,
+                    poll_interval=min(1.0, delivery_delay / 2),
+                    **batch_options,
+                )
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+        stats = requests.get(f"{base_url}/stub/stats").json()
+        extracted = list((tmp / "outputs" / "extracted_images").glob("*.TIF"))
+        log_lines = log_path.read_text().splitlines()
+    server.terminate()
+
+    calls = sum(stats["counts"].values())
+    print(f"wall time:       {elapsed:8.1f} s")
+    print(f"sites/s:         {sites / elapsed:8.1f}")
+    print(f"orders placed:   {stats['orders']:8d}")
+    print(f"tifs extracted:  {len(extracted):8d}")
+    print(
+        f"downloaded:      {stats['bytes_sent'] / 1e6:8.1f} MB "
+        f"({stats['bytes_sent'] / 1e6 / elapsed:.1f} MB/s)"
+    )
+    print(f"API calls:       {calls:8d} ({calls / sites:.1f} per site)")
+    for endpoint, count in sorted(stats["counts"].items()):
+        print(f"  {endpoint:15} {count:8d}")
+    print(f"injected errors: {stats['errors_injected']:8d}")
+    print(f"peak RSS:        {peak_rss_mb():8.0f} MB ({baseline_mb:.0f} MB before run)")
+    # The metrics table main() prints last
+    table = next(
+        (i for i, line in enumerate(log_lines) if line.startswith("kind ")), None
+    )
+    if table is not None:
+        print("\n".join(log_lines[table:]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sites", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--delivery_delay", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error_rate", type=float, default=0.01)
+    parser.add_argument("--failure_rate", type=float, default=0.0)
+    parser.add_argument("--scene_pixels", type=int, default=256)
+    parser.add_argument("--cluster_size", type=int, default=None)
+    parser.add_argument("--consolidate", action="store_true")
+    parser.add_argument("--remote_extract", action="store_true")
+    args = parser.parse_args()
+    main(
+        sites=args.sites,
+        workers=args.workers,
+        delivery_delay=args.delivery_delay,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        failure_rate=args.failure_rate,
+        scene_pixels=args.scene_pixels,
+        cluster_size=args.cluster_size,
+        consolidate=args.consolidate,
+        remote_extract=args.remote_extract,
+    )
@@ -0,0 +1,74 @@
+"""sift_images before and after the selection engine, over synthetic result sets
+
+Run from the repo root with `python -m benchmarks.bench_selection`.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from download_images_batch import sift_images
+from oneatlas.selection import select_images, weighted
+
+
+def old_sift_images(images):
+    """sift_images as it was: strptime in the sort key and two full sorts"""
+    images_sorted_by_date = sorted(
+        images,
+        key=lambda x: datetime.strptime(x["acquisition_date"], "%Y-%m-%dT%H:%M:%S.%fZ"),
+        reverse=True,
+    )
+    most_recent_image_id = images_sorted_by_date[0]["image_id"]
+    if len(images) == 1:
+        return [most_recent_image_id]
+    images_sorted_by_cloud_cover = sorted(
+        images_sorted_by_date[1:], key=lambda x: x["cloud_cover"]
+    )
+    return [most_recent_image_id, images_sorted_by_cloud_cover[0]["image_id"]]
+
+
+def synthetic_results(n, rng):
+    start = datetime(2015, 1, 1)
+    return [
+        {
+            "image_id": f"img-{i}",
+            # Coarse dates and cloud cover so ties are exercised too
+            "acquisition_date": (start + timedelta(days=rng.randrange(3000))).strftime(
+                "%Y-%m-%dT%H:%M:%S.%f"
+            )[:-3]
+            + "Z",
+            "cloud_cover": rng.randrange(31),
+            "incidence_angle": rng.uniform(0, 40),
+        }
+        for i in range(n)
+    ]
+
+
+def timed(func, result_sets):
+    start = time.perf_counter()
+    for images in result_sets:
+        func(images)
+    return time.perf_counter() - start
+
+
+def main(sets=2000, size=200, k=5, seed=0):
+    rng = random.Random(seed)
+    result_sets = [synthetic_results(rng.randrange(1, size), rng) for _ in range(sets)]
+    assert all(sift_images(r) == old_sift_images(r) for r in result_sets)
+    old = timed(old_sift_images, result_sets)
+    new = timed(sift_images, result_sets)
+    key = weighted(cloud_cover=1, incidence_angle=0.5, age_days=0.01)
+    top_k = timed(lambda r: select_images(r, k=k, key=key), result_sets)
+    print(f"{sets} result sets of up to {size} scenes (identical selections)")
+    print(f"old sift_images:           {old:6.3f}s")
+    print(f"new sift_images:           {new:6.3f}s ({old / new:.1f}x)")
+    print(f"weighted top-{k} selection:  {top_k:6.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark image selection.")
+    parser.add_argument("--sets", type=int, default=2000, help="Result sets.")
+    parser.add_argument("--size", type=int, default=200, help="Max scenes per set.")
+    args = parser.parse_args()
+    main(sets=args.sets, size=args.size)
@@ -0,0 +1,48 @@
+"""Requests/sec with and without the pooled client session
+
+Run from the repo root with `python -m benchmarks.bench_session`.
+"""
+
+import argparse
+import time
+
+import requests
+
+from oneatlas import OneAtlasClient
+from benchmarks.stub_server import start_server, point_client_at
+
+
+def bench_unpooled(client, n):
+    # What every call did before: a module-level request with a new connection
+    headers = client._access_token(client.CLIENT_ID_IDP)
+    start = time.perf_counter()
+    for i in range(n):
+        r = requests.get(f"{client.DATA_URL}/api/v1/orders/{i}", headers=headers)
+        r.raise_for_status()
+        r.json()
+    return n / (time.perf_counter() - start)
+
+
+def bench_pooled(client, n):
+    start = time.perf_counter()
+    for i in range(n):
+        client.get_order(i)
+    return n / (time.perf_counter() - start)
+
+
+def main(n=2000):
+    server, base_url = start_server()
+    with point_client_at(OneAtlasClient(api_key="stub"), base_url) as client:
+        unpooled = bench_unpooled(client, n)
+        pooled = bench_pooled(client, n)
+    server.shutdown()
+    print(f"{n} GET requests against {base_url}")
+    print(f"module-level requests: {unpooled:8.0f} req/s")
+    print(f"pooled client session: {pooled:8.0f} req/s ({pooled / unpooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pooled session.")
+    parser.add_argument("-n", type=int, default=2000, help="Number of requests.")
+    args = parser.parse_args()
+    main(n=args.n)
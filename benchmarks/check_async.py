@@ -0,0 +1,306 @@
+"""Checks of AsyncOneAtlasClient against the stub server
+
+Covers what bench_async doesn't: token refresh (one authentication however
+many coroutines need the token), the retry path (503s retried for GETs and
+flagged POSTs, never for create_order; refused connections retried even for
+create_order, as nothing was sent), the max_concurrency cap, and downloads of
+several sizes, also with a slow disk that mustn't stall the event loop. Prints one line per check and exits non-zero if any fails.
+Run from the repo root with `python -m benchmarks.check_async`.
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import aiohttp
+
+from oneatlas import RetryPolicy, aio
+from oneatlas.aio import AsyncOneAtlasClient
+from benchmarks.stub_server import (
+    StubHandler,
+    download_bytes,
+    point_client_at,
+    start_server,
+)
+
+
+class CountingHandler(StubHandler):
+    """StubHandler that counts tokens and in-flight requests and fails on demand
+
+    Paths containing "fail<n>" answer 503 to their first n requests.
+    """
+
+    latency = 0.02
+    expires_in = 3600
+
+    @classmethod
+    def with_state(cls, **options):
+        state = {
+            "lock": threading.Lock(),
+            "tokens": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "failures": {},
+        }
+        return type("CountingHandler", (cls,), dict(options, state=state))
+
+    def _track(self, delta):
+        with self.state["lock"]:
+            self.state["in_flight"] += delta
+            self.state["max_in_flight"] = max(
+                self.state["max_in_flight"], self.state["in_flight"]
+            )
+
+    def _should_fail(self):
+        for part in self.path.split("?")[0].split("/"):
+            if part.startswith("fail") and part[4:].isdigit():
+                with self.state["lock"]:
+                    seen = self.state["failures"].get(self.path, 0)
+                    self.state["failures"][self.path] = seen + 1
+                return seen < int(part[4:])
+        return False
+
+    def _respond(self, payload):
+        if self._should_fail():
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(payload)
+
+    def do_GET(self):
+        self._track(1)
+        try:
+            if self.path.startswith("/download/"):
+                self._send_download(int(self.path.split("/")[2].split("?")[0]))
+                return
+            self._respond({"id": self.path.rsplit("/", 1)[-1], "status": "delivered"})
+        finally:
+            self._track(-1)
+
+    def do_POST(self):
+        self._track(1)
+        try:
+            self._read_body()
+            if self.path.endswith("/openid-connect/token"):
+                with self.state["lock"]:
+                    self.state["tokens"] += 1
+                self._send_json(
+                    {"access_token": "stub-token", "expires_in": self.expires_in}
+                )
+                return
+            self._respond({"price": 0, "features": []})
+        finally:
+            self._track(-1)
+
+
+def fast_retry():
+    return RetryPolicy(max_attempts=4, backoff_factor=0.01, jitter=False)
+
+
+async def check_token_refresh(base_url, handler):
+    # Tokens live 2 s and are refreshed 1.8 s early, so they are due after 0.2 s
+    client = point_client_at(
+        AsyncOneAtlasClient(api_key="stub", token_refresh_margin=1.8), base_url
+    )
+    async with client:
+        await asyncio.gather(*(client.get_order(i) for i in range(50)))
+        first = handler.state["tokens"]
+        await asyncio.sleep(0.3)
+        await asyncio.gather(*(client.get_order(i) for i in range(50)))
+        second = handler.state["tokens"] - first
+    ok = first == 1 and second == 1
+    return ok, f"50 concurrent calls authenticated {first}x, after expiry {second}x"
+
+
+async def check_retries(base_url, handler):
+    client = point_client_at(
+        AsyncOneAtlasClient(api_key="stub", retry=fast_retry()), base_url
+    )
+    async with client:
+        order = await client.get_order("fail2")
+        retried = dict(client.retry_stats["retried_statuses"])
+        # Prices are POSTs flagged idempotent, so retried like a GET
+        client.DATA_URL = f"{base_url}/fail1/data"
+        await client.get_price({})
+        try:
+            await client.create_order({})
+            created = "created"
+        except aiohttp.ClientResponseError as e:
+            created = e.status
+    stats = client.retry_stats
+    ok = (
+        order["id"] == "fail2"
+        and retried == {503: 2}
+        and stats["retries"] == 2 + 1
+        and created == 503
+    )
+    return ok, (
+        f"GET after 2x503: {order['id']}, price after 1x503 ok, "
+        f"create_order on 503: {created} (not retried), {stats['retries']} retries"
+    )
+
+
+async def check_never_sent(closed_url):
+    client = point_client_at(
+        AsyncOneAtlasClient(api_key="stub", retry=fast_retry()), closed_url
+    )
+    async with client:
+        # Authentication fails to connect first; it is idempotent, so retried
+        try:
+            await client.create_order({})
+            raised = None
+        except aiohttp.ClientConnectorError as e:
+            raised = type(e).__name__
+    stats = client.retry_stats
+    ok = raised and stats["connection_errors"] == 3 and stats["gave_up"] == 1
+    return ok, (
+        f"refused connection: {stats['connection_errors']} retries, then {raised}"
+    )
+
+
+async def check_never_sent_order(base_url, closed_url):
+    # Token from the live server, then orders sent to a closed port: the
+    # non-idempotent POST is retried because no connection was ever made
+    client = point_client_at(
+        AsyncOneAtlasClient(api_key="stub", retry=fast_retry()), base_url
+    )
+    async with client:
+        await client.get_order(1)
+        client.DATA_URL = f"{closed_url}/data"
+        try:
+            await client.create_order({})
+        except aiohttp.ClientConnectorError:
+            pass
+    stats = client.retry_stats
+    ok = stats["connection_errors"] == 3 and stats["gave_up"] == 1
+    return ok, f"create_order to a refused port retried {stats['connection_errors']}x"
+
+
+async def check_concurrency(base_url, handler, cap=5, n=60):
+    client = point_client_at(
+        AsyncOneAtlasClient(api_key="stub", max_concurrency=cap), base_url
+    )
+    async with client:
+        await client.get_order(0)
+        handler.state["max_in_flight"] = 0
+        await asyncio.gather(*(client.get_order(i) for i in range(n)))
+    peak = handler.state["max_in_flight"]
+    return peak == cap, f"{n} calls with max_concurrency={cap}: peak {peak} in flight"
+
+
+async def check_downloads(base_url, sizes=(0, 1, 255, 65536, 3_000_001)):
+    client = point_client_at(AsyncOneAtlasClient(api_key="stub"), base_url)
+    bad = []
+    async with client:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in sizes:
+                path = Path(tmp) / f"{size}.zip"
+                await client.download_url_to_file(f"{base_url}/download/{size}", path)
+                expected = download_bytes(0, size - 1) if size else b""
+                if path.read_bytes() != expected:
+                    bad.append(size)
+    return not bad, f"downloads of {', '.join(map(str, sizes))} bytes" + (
+        f", wrong: {bad}" if bad else " intact"
+    )
+
+
+class SlowFile:
+    """File whose writes take `delay` seconds, standing in for a slow disk"""
+
+    def __init__(self, file, delay):
+        self.file = file
+        self.delay = delay
+
+    def write(self, data):
+        time.sleep(self.delay)
+        return self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def check_slow_disk(base_url, delay=0.05, n=4, size=3_000_001):
+    # The event loop must keep ticking while downloads wait on the disk
+    client = point_client_at(AsyncOneAtlasClient(api_key="stub"), base_url)
+    aio.open = lambda *args: SlowFile(open(*args), delay)
+    stalls = []
+
+    async def heartbeat(done):
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - start - 0.005)
+
+    try:
+        async with client:
+            with tempfile.TemporaryDirectory() as tmp:
+                done = asyncio.Event()
+                beat = asyncio.create_task(heartbeat(done))
+                await asyncio.gather(
+                    *(
+                        client.download_url_to_file(
+                            f"{base_url}/download/{size}", Path(tmp) / f"{i}.zip"
+                        )
+                        for i in range(n)
+                    )
+                )
+                done.set()
+                await beat
+    finally:
+        del aio.open
+    worst = max(stalls) * 1000
+    return worst < delay * 1000 / 2, (
+        f"{n} downloads with {delay * 1000:.0f} ms writes: "
+        f"event loop stalled {worst:.0f} ms at most"
+    )
+
+
+def closed_port_url():
+    server, url = start_server()
+    server.shutdown()
+    server.server_close()
+    return url
+
+
+async def run_checks():
+    results = []
+    handler = CountingHandler.with_state(expires_in=2)
+    server, base_url = start_server(handler)
+    results.append(await check_token_refresh(base_url, handler))
+    server.shutdown()
+
+    handler = CountingHandler.with_state()
+    server, base_url = start_server(handler)
+    closed_url = closed_port_url()
+    results.append(await check_retries(base_url, handler))
+    results.append(await check_never_sent(closed_url))
+    results.append(await check_never_sent_order(base_url, closed_url))
+    results.append(await check_concurrency(base_url, handler))
+    results.append(await check_downloads(base_url))
+    results.append(await check_slow_disk(base_url))
+    server.shutdown()
+    return results
+
+
+def main():
+    start = time.perf_counter()
+    results = asyncio.run(run_checks())
+    for ok, message in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+    print(f"{len(results)} checks in {time.perf_counter() - start:.1f}s")
+    return all(ok for ok, _ in results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
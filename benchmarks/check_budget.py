@@ -0,0 +1,70 @@
+"""Check that --budget holds across reruns sharing one ledger
+
+Runs download_images_batch twice against the fake OneAtlas API with the same
+ledger and budget, as after a crash and restart, and fails (exit status 1)
+if the orders in the ledger cost more than the budget or the rerun placed
+anything once the budget was spent. Run from the repo root with
+`python -m benchmarks.check_budget`.
+"""
+
+import argparse
+import contextlib
+import io
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks import bench_pipeline
+
+ORDERED = ("ordered", "delivered", "downloaded", "extracted")
+
+
+def ordered_spend(ledger_path):
+    """(orders placed, total price) from a JobLedger file"""
+    with contextlib.closing(sqlite3.connect(ledger_path)) as conn:
+        rows = conn.execute(
+            f"SELECT price FROM orders WHERE stage IN ({','.join('?' * len(ORDERED))})",
+            ORDERED,
+        ).fetchall()
+    return len(rows), sum(price or 0 for (price,) in rows)
+
+
+def main(sites=30, budget=600.0):
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger_path = Path(tmp) / "batch_jobs.sqlite"
+        placed = []
+        for run in (1, 2):
+            with contextlib.redirect_stdout(io.StringIO()):
+                bench_pipeline.main(
+                    sites=sites,
+                    workers=8,
+                    delivery_delay=0.2,
+                    error_rate=0.0,
+                    budget=budget,
+                    ledger_path=ledger_path,
+                )
+            orders, spend = ordered_spend(ledger_path)
+            placed.append(orders)
+            print(f"run {run}: {orders} orders in the ledger for {spend:,.2f}")
+        if spend > budget:
+            print(f"  over budget of {budget:,.2f}")
+            ok = False
+        if placed[0] == 0:
+            print("  nothing ordered, the budget check proved nothing")
+            ok = False
+        elif placed[1] != placed[0]:
+            # The first run fills the budget as far as any order fits; a rerun
+            # has only the same candidates, so it must not add to them
+            print(f"  rerun placed {placed[1] - placed[0]} more orders")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sites", type=int, default=30)
+    parser.add_argument("--budget", type=float, default=600.0)
+    args = parser.parse_args()
+    sys.exit(0 if main(sites=args.sites, budget=args.budget) else 1)
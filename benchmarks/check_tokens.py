@@ -0,0 +1,72 @@
+"""Check that background token renewal keeps requests off authentication
+
+Runs a TokenManager with background=True, with and without a token cache
+file, while the main thread keeps asking for headers for --seconds. Tokens
+live --lifetime seconds, so several renewals are due; every one after the
+first authentication must be made by the background thread and counted in
+background_refreshes. Exits non-zero otherwise. Run from the repo root with
+`python -m benchmarks.check_tokens`.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from oneatlas.tokens import TokenManager
+
+
+def run(cache_path, seconds, lifetime, margin):
+    """(thread name of each authentication, TokenManager stats)"""
+    fetched_by = []
+
+    def fetch(client_id):
+        fetched_by.append(threading.current_thread().name)
+        return {"access_token": f"token-{len(fetched_by)}", "expires_in": lifetime}
+
+    tokens = TokenManager(
+        fetch, refresh_margin=margin, cache_path=cache_path, background=True
+    )
+    try:
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            tokens.headers("client")
+            time.sleep(0.02)
+    finally:
+        tokens.stop()
+    return fetched_by, tokens.stats
+
+
+def main(seconds=6.0, lifetime=2.0, margin=0.4):
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for cache_path in (None, Path(tmp) / "tokens.json"):
+            fetched_by, stats = run(cache_path, seconds, lifetime, margin)
+            foreground = fetched_by.count(threading.main_thread().name)
+            print(
+                f"cache {'on ' if cache_path else 'off'}: {len(fetched_by)} "
+                f"authentications, {foreground} on the main thread, "
+                f"{stats['background_refreshes']} background refreshes"
+            )
+            if foreground != 1 or len(fetched_by) < 3:
+                print("  renewals should all happen in the background")
+                ok = False
+            if stats["background_refreshes"] != len(fetched_by) - 1:
+                print("  background_refreshes doesn't match what was fetched")
+                ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--lifetime", type=float, default=2.0)
+    parser.add_argument("--margin", type=float, default=0.4)
+    args = parser.parse_args()
+    sys.exit(
+        0
+        if main(seconds=args.seconds, lifetime=args.lifetime, margin=args.margin)
+        else 1
+    )
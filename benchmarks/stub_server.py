@@ -0,0 +1,482 @@
+"""Local stand-ins for the OneAtlas API used by the benchmarks
+
+StubHandler answers every call instantly with a fixed response, for
+measuring the client itself; FakeOneAtlasHandler keeps orders and answers
+searches so the whole batch pipeline can run offline. Run from the repo root
+with e.g. `python -m benchmarks.stub_server [--fake]`.
+"""
+
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+import zipfile
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def download_bytes(start, end):
+    """Deterministic content of the stub download files"""
+    pattern = bytes(range(256))
+    first = start - start % 256
+    data = pattern * ((end - first) // 256 + 1)
+    return data[start - first : end - first + 1]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle stalls on reuse
+    disable_nagle_algorithm = True
+    # Bytes per second per connection for downloads (None for unlimited)
+    download_rate = None
+    # Seconds added to every JSON response to mimic API latency
+    latency = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _send_download(self, size):
+        """Serve /download/<size>, honouring a single Range header"""
+        self._send_range(size, download_bytes)
+
+    def _send_range(self, size, read, content_type="application/zip"):
+        """Send bytes read(start, end) of a size-byte file, honouring a single Range"""
+        start, end, status = 0, size - 1, 200
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        block = 256 * 1024
+        for offset in range(start, end + 1, block):
+            chunk_end = min(offset + block - 1, end)
+            self.wfile.write(read(offset, chunk_end))
+            if self.download_rate:
+                time.sleep((chunk_end - offset + 1) / self.download_rate)
+
+    def do_GET(self):
+        if self.path.startswith("/download/"):
+            self._send_download(int(self.path.split("/")[2].split("?")[0]))
+            return
+        self._send_json({"id": self.path.rsplit("/", 1)[-1], "status": "delivered"})
+
+    def do_POST(self):
+        self._read_body()
+        if self.path.endswith("/openid-connect/token"):
+            self._send_json({"access_token": "stub-token", "expires_in": 3600})
+        else:
+            self._send_json({"price": 0, "features": []})
+
+
+# 2023-01-01T00:00:00Z, for acquisition times in delivered file names
+YEAR_2023 = 1672531200
+# Stored (uncompressed) member name, rewritten per order in the served bytes
+SCENE_MEMBER = b"IMG_PHR1A_PMS_000000000000000_R1C1.TIF"
+
+
+def scene_zip(pixels=512):
+    """Bytes of a delivery-like zip holding one pixels x pixels 3-band GeoTIFF
+
+    The tif spans mainland Scotland (UTM 30N), so every synthetic site lies
+    inside it and consolidated groups can be clipped from it.
+    """
+    import numpy as np
+    import rasterio
+    from rasterio.io import MemoryFile
+    from rasterio.transform import from_origin
+
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 255, (3, pixels, pixels), dtype=np.uint8)
+    with MemoryFile() as memfile:
+        with memfile.open(
+            driver="GTiff",
+            width=pixels,
+            height=pixels,
+            count=3,
+            dtype="uint8",
+            crs="EPSG:32630",
+            transform=from_origin(200000, 6600000, 500000 / pixels, 600000 / pixels),
+        ) as dst:
+            dst.write(data)
+        tif = memfile.read()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("PHR/" + SCENE_MEMBER.decode(), tif)
+        zf.writestr("PHR/DIM_PHR1A_PMS_202306011100000.XML", "<Dimap_Document/>")
+    return buffer.getvalue()
+
+
+class FakeOneAtlasHandler(StubHandler):
+    """A stateful fake of the API endpoints the batch pipeline uses
+
+    - token: POST .../openid-connect/token
+    - opensearch: POST .../api/v2/opensearch, answered from a fixed grid of
+      overlapping scene footprints (SCENE_STEP degrees apart, SCENES_PER_CELL
+      acquisitions each) honouring relation, cloudCover and paging
+    - prices: POST .../api/v1/prices, PRICE_PER_KM2 of the order AOI's
+      bounding box (at least MIN_AREA_KM2), multiSpectral at half price
+    - orders: POST/GET .../api/v1/orders[/<id>], which move from ordered to
+      in_progress to delivered (or, for failure_rate of them, failed) over
+      delivery_delay seconds, with a download link once delivered
+    - downloads: GET /download/zip/<order id> serves scene_zip() with ranges
+
+    Every JSON response waits `latency` seconds and a share error_rate of
+    them (other than order creation, which is not safe to retry) fail with a
+    503. GET /stub/stats returns request counts per endpoint. Use
+    with_state() to get a handler class with its own orders and counters.
+    """
+
+    SCENE_STEP = 0.2
+    SCENE_MARGIN = 0.1
+    SCENES_PER_CELL = 4
+    PRICE_PER_KM2 = 10.0
+    MIN_AREA_KM2 = 1.0
+    delivery_delay = 1.0
+    failure_rate = 0.0
+    error_rate = 0.0
+    scene_pixels = 512
+
+    @classmethod
+    def with_state(cls, **options):
+        state = {
+            "orders": {},
+            "counts": {},
+            "bytes_sent": 0,
+            "errors_injected": 0,
+            "lock": threading.Lock(),
+            "zip": scene_zip(options.get("scene_pixels", cls.scene_pixels)),
+            "random": random.Random(0),
+        }
+        return type("FakeOneAtlas", (cls,), {**options, "state": state})
+
+    def _count(self, endpoint):
+        with self.state["lock"]:
+            counts = self.state["counts"]
+            counts[endpoint] = counts.get(endpoint, 0) + 1
+
+    def _inject_error(self):
+        with self.state["lock"]:
+            fail = self.state["random"].random() < self.error_rate
+            if fail:
+                self.state["errors_injected"] += 1
+        if fail:
+            self._send_json({"error": "injected"}, status=503)
+        return fail
+
+    def _base_url(self):
+        return f"http://{self.headers['Host']}"
+
+    def _order_view(self, order):
+        """The order as the API would show it now"""
+        elapsed = time.time() - order["created"]
+        view = {k: v for k, v in order.items() if k not in ("created", "will_fail")}
+        if elapsed < self.delivery_delay / 2:
+            view["status"] = "ordered"
+        elif elapsed < self.delivery_delay:
+            view["status"] = "in_progress"
+        elif order["will_fail"]:
+            view["status"] = "failed"
+        else:
+            view["status"] = "delivered"
+            href = f"{self._base_url()}/download/zip/{order['id']}"
+            view["deliveries"] = [{"_links": {"download": {"href": href}}}]
+        return view
+
+    def _price(self, body):
+        price = 0.0
+        for product in body.get("products", []):
+            coords = product["aoi"]["coordinates"][0]
+            xs = [c[0] for c in coords]
+            ys = [c[1] for c in coords]
+            # Degrees to km, near enough at these latitudes
+            km_x = (
+                (max(xs) - min(xs)) * 111.32 * math.cos(math.radians(sum(ys) / len(ys)))
+            )
+            km_y = (max(ys) - min(ys)) * 110.57
+            area = max(self.MIN_AREA_KM2, km_x * km_y)
+            rate = self.PRICE_PER_KM2
+            if product.get("productType") == "multiSpectral":
+                rate /= 2
+            price += area * rate
+        return round(price, 2)
+
+    def _scenes(self, body):
+        """Features of the scene grid matching an opensearch body"""
+        shape = body["geometry"]
+        coords = shape["coordinates"][0]
+        minx = min(c[0] for c in coords)
+        maxx = max(c[0] for c in coords)
+        miny = min(c[1] for c in coords)
+        maxy = max(c[1] for c in coords)
+        step, margin = self.SCENE_STEP, self.SCENE_MARGIN
+        cloud = [
+            float(v) for v in body.get("cloudCover", "[0,100]").strip("[]").split(",")
+        ]
+        contains = body.get("relation", "intersects") == "contains"
+        features = []
+        for cx in range(
+            math.floor((minx - margin) / step), math.floor((maxx + margin) / step) + 1
+        ):
+            for cy in range(
+                math.floor((miny - margin) / step),
+                math.floor((maxy + margin) / step) + 1,
+            ):
+                fx0, fy0 = cx * step - margin, cy * step - margin
+                fx1, fy1 = (cx + 1) * step + margin, (cy + 1) * step + margin
+                if contains:
+                    match = fx0 <= minx and fy0 <= miny and fx1 >= maxx and fy1 >= maxy
+                else:
+                    match = fx0 <= maxx and fy0 <= maxy and fx1 >= minx and fy1 >= miny
+                if not match:
+                    continue
+                for k in range(self.SCENES_PER_CELL):
+                    seed = zlib.crc32(f"{cx},{cy},{k}".encode())
+                    cloud_cover = seed % 40
+                    if not cloud[0] <= cloud_cover <= cloud[1]:
+                        continue
+                    scene_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{cx},{cy},{k}"))
+                    footprint = [
+                        [fx0, fy0],
+                        [fx1, fy0],
+                        [fx1, fy1],
+                        [fx0, fy1],
+                        [fx0, fy0],
+                    ]
+                    features.append(
+                        {
+                            "type": "Feature",
+                            "geometry": {"type": "Polygon", "coordinates": [footprint]},
+                            "properties": {
+                                "id": scene_id,
+                                "acquisitionDate": f"2023-{seed % 12 + 1:02d}-{seed % 28 + 1:02d}T11:{seed % 60:02d}:00.000Z",
+                                "cloudCover": cloud_cover,
+                                "incidenceAngle": seed % 30,
+                                "constellation": "PHR",
+                            },
+                            "_links": {
+                                "quicklook": {
+                                    "href": f"{self._base_url()}/quicklook/{scene_id}"
+                                }
+                            },
+                        }
+                    )
+        page = int(body.get("startPage", 1))
+        per_page = int(body.get("itemsPerPage", 100))
+        return {
+            "type": "FeatureCollection",
+            "totalResults": len(features),
+            "startPage": page,
+            "itemsPerPage": per_page,
+            "features": features[(page - 1) * per_page : page * per_page],
+        }
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = dict(urllib.parse.parse_qsl(query))
+        if path == "/stub/stats":
+            with self.state["lock"]:
+                stats = {
+                    "counts": dict(self.state["counts"]),
+                    "orders": len(self.state["orders"]),
+                    "bytes_sent": self.state["bytes_sent"],
+                    "errors_injected": self.state["errors_injected"],
+                }
+            self._send_json(stats)
+            return
+        if path.startswith("/download/zip/"):
+            # Same tif for every order, but named by order so extracts don't
+            # clash: a 2023 acquisition time to the tenth of a second
+            tenths = zlib.crc32(path.encode()) % (365 * 86400 * 10)
+            seconds = time.strftime(
+                "%Y%m%d%H%M%S", time.gmtime(YEAR_2023 + tenths // 10)
+            )
+            stamp = f"{seconds}{tenths % 10}".encode()
+            data = self.state["zip"].replace(
+                SCENE_MEMBER, SCENE_MEMBER.replace(b"0" * 15, stamp)
+            )
+            self._count("download")
+
+            def read(start, end):
+                with self.state["lock"]:
+                    self.state["bytes_sent"] += end - start + 1
+                return data[start : end + 1]
+
+            self._send_range(len(data), read)
+            return
+        if path.startswith("/download/"):
+            super().do_GET()
+            return
+        if path.endswith("/api/v1/orders"):
+            self._count("list orders")
+            if self._inject_error():
+                return
+            with self.state["lock"]:
+                orders = list(self.state["orders"].values())
+            ref = params.get("customerRef")
+            if ref:
+                orders = [o for o in orders if o["customerRef"] == ref]
+            orders.sort(key=lambda o: o["created"], reverse=True)
+            page = int(params.get("page", 1))
+            per_page = int(params.get("itemsPerPage", 10))
+            items = orders[(page - 1) * per_page : page * per_page]
+            self._send_json(
+                {
+                    "totalResults": len(orders),
+                    "items": [self._order_view(o) for o in items],
+                }
+            )
+            return
+        if "/api/v1/orders/" in path:
+            self._count("get order")
+            if self._inject_error():
+                return
+            order = self.state["orders"].get(path.rsplit("/", 1)[-1])
+            if order is None:
+                self._send_json({"error": "not found"}, status=404)
+            else:
+                self._send_json(self._order_view(order))
+            return
+        self._count("other")
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        path = self.path.partition("?")[0]
+        raw = self._read_body()
+        if path.endswith("/openid-connect/token"):
+            self._count("token")
+            if not self._inject_error():
+                self._send_json({"access_token": "fake-token", "expires_in": 3600})
+            return
+        body = json.loads(raw or b"{}")
+        if path.endswith("/api/v2/opensearch"):
+            self._count("search")
+            if not self._inject_error():
+                self._send_json(self._scenes(body))
+            return
+        if path.endswith("/api/v1/prices"):
+            self._count("price")
+            if not self._inject_error():
+                self._send_json(
+                    {"price": self._price(body), "currency": "EUR", "deliveries": []}
+                )
+            return
+        if path.endswith("/api/v1/orders"):
+            self._count("create order")
+            with self.state["lock"]:
+                order = {
+                    "id": str(uuid.uuid4()),
+                    "customerRef": body.get("customerRef"),
+                    "kind": body.get("kind"),
+                    "created": time.time(),
+                    "will_fail": self.state["random"].random() < self.failure_rate,
+                }
+                self.state["orders"][order["id"]] = order
+            self._send_json(self._order_view(order), status=201)
+            return
+        self._count("other")
+        self._send_json({"error": "not found"}, status=404)
+
+
+def serve_in_process(host="127.0.0.1", **options):
+    """Run a FakeOneAtlasHandler.with_state(**options) server in a child process
+
+    Returns (process, base_url). Keeps the server's CPU and memory out of
+    measurements of the client.
+    """
+    import multiprocessing
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_serve_forever, args=(host, options, child), daemon=True
+    )
+    process.start()
+    return process, parent.recv()
+
+
+def _serve_forever(host, options, pipe):
+    server, base_url = start_server(FakeOneAtlasHandler.with_state(**options), host)
+    pipe.send(base_url)
+    threading.Event().wait()
+
+
+def start_server(handler=StubHandler, host="127.0.0.1", port=0):
+    """Start the stub server in a daemon thread, returning (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def point_client_at(client, base_url):
+    """Send all of a client's API calls to base_url
+
+    Each API gets its own path prefix so the client still tells them apart
+    (e.g. for rate limiting); the stub routes on the rest of the path.
+    """
+    client.AUTH_URL = f"{base_url}/auth"
+    client.DATA_URL = f"{base_url}/data"
+    client.SEARCH_URL = f"{base_url}/search"
+    return client
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--fake", action="store_true", help="Serve FakeOneAtlasHandler."
+    )
+    parser.add_argument("--delivery_delay", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--error_rate", type=float, default=0)
+    parser.add_argument("--failure_rate", type=float, default=0)
+    args = parser.parse_args()
+    handler = StubHandler
+    if args.fake:
+        handler = FakeOneAtlasHandler.with_state(
+            delivery_delay=args.delivery_delay,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            failure_rate=args.failure_rate,
+        )
+    server, base_url = start_server(handler, port=args.port)
+    print(f"stub OneAtlas API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,217 +1,777 @@
-from oneatlas import OneAtlasClient  # custom class in this repo
+# custom classes in this repo
+from oneatlas import (
+    OneAtlasClient,
+    OrderTracker,
+    JobLedger,
+    Metrics,
+    RateLimiter,
+    ResponseCache,
+)
+
+# Geospatial modules (geopandas, shapely, rasterio) are imported in the stages
+# that use them, so spawned COG workers and `import download_images_batch`
+# don't load them all just to start
 import json
-import geopandas as gpd
-from shapely.geometry import box
 from pathlib import Path
+import os
 import shutil
 import zipfile
-import time
 import argparse
-from datetime import datetime
-
-
-# Define function to convert points -> buffer -> bounding box
-def points_to_buffer_box(gdf, buffer_distance=500):
-    """Buffer points by distance and convert to bounding boxes"""
-    # Check if all geometries are Points
-    if not all(gdf.geometry.geom_type == "Point"):
-        print("All geometries in the GeoDataFrame must be Points. Exiting.")
+from contextlib import nullcontext
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+from functools import partial
+
+
+def select_zip_member(zip_ref, extensions=(".tif", ".tiff"), select="largest"):
+    """Pick the member to keep using the zip's central directory, without extracting
+
+    Extensions are matched case-insensitively. select is "largest", "smallest"
+    or a function taking the list of matching ZipInfo and returning one.
+    """
+    candidates = [
+        info
+        for info in zip_ref.infolist()
+        if not info.is_dir() and Path(info.filename).suffix.lower() in extensions
+    ]
+    if not candidates:
         return None
-    # Reproject to EPSG 27700
-    gdf = gdf.to_crs(epsg=27700)
-    # Buffer the geometries
-    gdf["geometry"] = gdf.geometry.buffer(buffer_distance)
-    # Convert buffers to bounding boxes
-    gdf["geometry"] = gdf.geometry.apply(lambda geom: box(*geom.bounds))
-    return gdf
-
-
-def aoi_gdf_to_search_geojson(gdf, uid_column=None):
-    """Convert geodataframe to geojson ensuring unique ids per feature"""
-    if uid_column is None:
-        uid_column = "id"
-        gdf[uid_column] = gdf.index
-    else:
-        if not gdf[uid_column].is_unique:
-            raise ValueError(
-                f"Values in '{uid_column}' are not unique. Consider using default uid_column=None to add uids."
-            )
-    json_str = gdf[[uid_column, "geometry"]].to_crs(epsg=4326).to_json(drop_id=True)
-    return json.loads(json_str), gdf[uid_column].tolist()
-
+    if select == "largest":
+        return max(candidates, key=lambda info: info.file_size)
+    if select == "smallest":
+        return min(candidates, key=lambda info: info.file_size)
+    if callable(select):
+        return select(candidates)
+    raise ValueError(
+        f"select must be 'largest', 'smallest' or a function, not {select}"
+    )
 
-def get_feature_by_id(geojson, id_vals, search_id, uid_column="id"):
-    """Filter geojson features to just one specified id"""
-    if search_id not in id_vals:
-        raise ValueError(f"id {search_id} not in list of id values")
-    for feature in geojson["features"]:
-        if feature["properties"][uid_column] == search_id:
-            return feature
-    return None
 
+def extract_zip_member(
+    zip_source,
+    target_directory,
+    number_suffix,
+    extensions=(".tif", ".tiff"),
+    select="largest",
+):
+    """Stream the selected tif from a zip (path or seekable file) to target_directory
 
-def process_zip_file(zip_file_path, target_directory, delete_zip=True):
+    Only the chosen member is decompressed, straight to <name>_<number>.<ext>
+    via a .part file, so nothing else in the bundle touches the disk.
+    """
+    target_directory = Path(target_directory)
+    with zipfile.ZipFile(zip_source, "r") as zip_ref:
+        member = select_zip_member(zip_ref, extensions=extensions, select=select)
+        if member is None:
+            return None
+        member_path = Path(member.filename)
+        target_file_path = (
+            target_directory / f"{member_path.stem}_{number_suffix}{member_path.suffix}"
+        )
+        part_path = target_file_path.with_name(target_file_path.name + ".part")
+        with zip_ref.open(member) as src, open(part_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(part_path, target_file_path)
+    return target_file_path
+
+
+def process_zip_file(
+    zip_file_path,
+    target_directory,
+    delete_zip=True,
+    extensions=(".tif", ".tiff"),
+    select="largest",
+    number_suffix=None,
+):
     """Extract largest tif image from zip and store in local directory"""
     zip_file_path = Path(zip_file_path)
-    target_directory = Path(target_directory)
-    # Extract the ZIP file
-    with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-        temp_extract_dir = zip_file_path.parent / "temp_extracted"
-        zip_ref.extractall(temp_extract_dir)
-    # Find the largest .tif file
-    largest_tif_file = None
-    largest_size = 0
-    for file in temp_extract_dir.rglob("*.TIF"):
-        if file.stat().st_size > largest_size:
-            largest_tif_file = file
-            largest_size = file.stat().st_size
-    if largest_tif_file is not None:
-        # Copy it to the target directory with _<number> appended to the file name
+    # Keep the tif with _<number> appended to the file name
+    if number_suffix is None:
         number_suffix = zip_file_path.stem.split("_")[-1]
-        new_file_name = (
-            largest_tif_file.stem + f"_{number_suffix}" + largest_tif_file.suffix
-        )
-        target_file_path = target_directory / new_file_name
-        shutil.copy(largest_tif_file, target_file_path)
-        # Delete the extracted ZIP file and temporary directory
-        shutil.rmtree(temp_extract_dir)
+    target_file_path = extract_zip_member(
+        zip_file_path, target_directory, number_suffix, extensions, select
+    )
+    if target_file_path is not None:
         if delete_zip:
             zip_file_path.unlink()
         print(f"extracted {target_file_path}")
     else:
         print("No .tif files found in the ZIP archive.")
+    return target_file_path
 
 
 def sift_images(images):
-    # Sort images by acquisition date in descending order to get the most recent first
-    images_sorted_by_date = sorted(
-        images,
-        key=lambda x: datetime.strptime(x["acquisition_date"], "%Y-%m-%dT%H:%M:%S.%fZ"),
-        reverse=True,
-    )
+    """Ids of the most recent image and the least cloudy of the others"""
+    from oneatlas.selection import newest, select_images
 
-    # Extract the most recent image's id
-    most_recent_image_id = images_sorted_by_date[0]["image_id"]
+    # Most recent first; ISO date strings compare without parsing
+    most_recent = select_images(images, key=newest)[0]
 
     # If there is only one image in the list, return its id only
     if len(images) == 1:
-        return [most_recent_image_id]  # Only one image id to return
-
-    # Otherwise, find the image with the least cloud cover, excluding the most recent image
-    # Sort images by cloud cover, excluding the most recent image
-    images_sorted_by_cloud_cover = sorted(
-        images_sorted_by_date[1:], key=lambda x: x["cloud_cover"]
-    )
+        return [most_recent["image_id"]]
 
-    # Extract the image id with the least cloud cover
-    least_cloud_cover_image_id = (
-        images_sorted_by_cloud_cover[0]["image_id"]
-        if images_sorted_by_cloud_cover
-        else None
-    )
+    # Otherwise the least cloudy of the rest, newest first on a tie
+    rest = [image for image in images if image is not most_recent]
+    least_cloudy = select_images(rest, key=lambda x: (x["cloud_cover"], newest(x)))
+    return [most_recent["image_id"], least_cloudy[0]["image_id"]]
 
-    return [most_recent_image_id, least_cloud_cover_image_id]
 
+def record_results(search, table):
+    """Wrap search() so every response is also appended to a SceneTable"""
 
-def main(buffer_distance=750, id_start=1, id_end=None):
-    # Read local config.json to get api key and directory for outputs
-    with open("config.json", "r") as file:
-        config = json.load(file)
+    def search_and_record():
+        results = search()
+        table.append(results)
+        return results
 
-    api_key = config["api_key"]
+    return search_and_record
 
-    client = OneAtlasClient(api_key=api_key)
 
-    output_folder = Path(config["output_dir"])
-    input_file_gdb = Path(config["input_gdb"])
+def convert_to_cog(client, cog_pool, catalog, path, image_id):
+    """Rewrite an extracted tif as a COG in the process pool, if there is one"""
+    if cog_pool is None or path is None:
+        return path
+    from oneatlas.raster import to_cog
 
-    # function to convert polygon gdf to bounding box list
-    sites_gdf = gpd.read_file(input_file_gdb, layer="Registered_Sites_Merged_v2")
+    with stage_timer(client, "cog", path=path):
+        cog_pool.submit(to_cog, path).result()
+    if catalog is not None:
+        # Size and mtime have changed; keep the image id against the new file
+        catalog.add(path, image_id=image_id)
+    return path
 
-    # Drop rows with 'POINT EMPTY' geometry
-    sites_gdf = sites_gdf[~sites_gdf.geometry.is_empty]
 
-    # convert points geometry to bounding box around 500m buffer
-    sites_box_gdf = points_to_buffer_box(sites_gdf, buffer_distance=1000)
+def stage_timer(client, name, **fields):
+    """Time a pipeline stage in client.metrics, if the client has one"""
+    if client.metrics is None:
+        return nullcontext()
+    return client.metrics.stage(name, **fields)
 
-    search_geojson, id_vals = aoi_gdf_to_search_geojson(
-        sites_box_gdf, uid_column="image_id"
-    )
 
-    # Allow limits to image_id range processed
-    id_vals = [i for i in id_vals if i >= id_start]
-    if id_end is not None:
-        id_vals = [i for i in id_vals if i <= id_end]
-    print(f"processing ids {id_vals[0]} to {id_vals[-1]}")
-    for id in id_vals:
-        print(f"id {id}....")
-        # extract the geojson feature for that id
-        search_feature = get_feature_by_id(
-            search_geojson, id_vals, id, uid_column="image_id"
-        )
+class SiteLog:
+    """Print progress lines prefixed with the site id, one whole line at a time"""
 
-        # create search json - geometry is the search feature geometry
-        img_search_json = {
-            "cloudCover": "[0,30]",
-            "incidenceAngle": "[0,40]",
-            "processingLevel": "SENSOR",
-            "relation": "contains",
-            "geometry": search_feature["geometry"],
-            "constellation": "PHR",
-        }
+    _lock = threading.Lock()
 
-        # make the request
-        results = client.search(img_search_json)
+    def __init__(self, site_id):
+        self.site_id = site_id
 
-        # extract relevant values from the results and store in client instance
+    def __call__(self, message):
+        with self._lock:
+            print(f"[site {self.site_id}] {message}", flush=True)
 
-        client.extract_results(results)
 
-        if client.result_data:
-            image_refs = sift_images(client.result_data)
-            print(f"image_ids {", ".join(image_refs)} to order")
-            for i, img_ref in enumerate(image_refs):
-                print(f"ordering {img_ref}...")
-                order_body = {
-                    "kind": "order.data.product",
-                    "products": [
-                        {
-                            "productType": "pansharpened",  # pansharpened # multiSpectral
-                            "radiometricProcessing": "DISPLAY",  # REFLECTANCE # DISPLAY #
-                            "imageFormat": "image/geotiff",
-                            "crsCode": "urn:ogc:def:crs:EPSG::32630",  # UTM zone for Scotland
-                            "id": img_ref,
-                            "aoi": search_feature["geometry"],
-                        }
-                    ],
-                }
+def select_site_images(client, ledger, site_id, search, stage_limits):
+    """Image ids to order for a site, searching only if no earlier run did"""
+    image_refs = ledger.site_images(site_id)
+    if image_refs is None:
+        # make the request
+        with stage_limits["search"], stage_timer(client, "search", site=site_id):
+            results = search()
+
+        # extract relevant values from the results (kept local, workers share the client)
+        result_data = client.parse_results(results)
+        image_refs = sift_images(result_data) if result_data else []
+        ledger.record_search(site_id, image_refs)
+    return image_refs
+
+
+def order_body(img_ref, aoi, order_ref, product_type="pansharpened"):
+    """Body of the order for one image clipped to aoi (GeoJSON), as priced and placed"""
+    return {
+        "kind": "order.data.product",
+        "products": [
+            {
+                "productType": product_type,  # pansharpened # multiSpectral
+                "radiometricProcessing": "DISPLAY",  # REFLECTANCE # DISPLAY #
+                "imageFormat": "image/geotiff",
+                "crsCode": "urn:ogc:def:crs:EPSG::32630",  # UTM zone for Scotland
+                "id": img_ref,
+                "aoi": aoi,
+            }
+        ],
+        "customerRef": order_ref,
+    }
+
+
+def fulfil_order(
+    client,
+    tracker,
+    ledger,
+    log,
+    order_ref,
+    img_ref,
+    aoi,
+    number_suffix,
+    output_folder,
+    stage_limits,
+    remote_extract=False,
+    site_id=None,
+    catalog=None,
+    product_type="pansharpened",
+):
+    """Order one image clipped to aoi, wait for it, then download and extract it
+
+    Returns the extracted tif path, which is named with number_suffix. Each
+    stage is recorded in the ledger under order_ref and skipped if already done,
+    and nothing is ordered if the catalog already holds the image.
+    """
+    if ledger.reached(order_ref, "extracted"):
+        log(f"{order_ref} already extracted, skipping")
+        path = ledger.get(order_ref)["path"]
+        # Ledgers written before None was kept as NULL hold the text "None"
+        return None if path in (None, "None") else path
+
+    held = catalog.find(number_suffix, img_ref) if catalog is not None else None
+    if held:
+        log(f"{img_ref} already in {held}, skipping")
+        return held
+
+    if not ledger.reached(order_ref, "ordered"):
+        if ledger.get(order_ref) is None:
+            ledger.record(order_ref, "searched", site_id=site_id, image_id=img_ref)
+        # Sent just before a crash but never recorded? Look it up, never order twice
+        existing = None
+        if ledger.reached(order_ref, "ordering"):
+            existing = client.list_orders(customerRef=order_ref)["items"]
+        if existing:
+            log(f"re-attaching to existing order {order_ref}")
+            ledger.record(order_ref, "ordered", order_id=existing[0]["id"])
+        else:
+            log(f"ordering {img_ref}...")
+            body = order_body(img_ref, aoi, order_ref, product_type)
+
+            with stage_limits["order"]:
+                # Already priced if the run was planned with a quote
+                if not ledger.reached(order_ref, "priced"):
+                    with stage_timer(client, "price", order=order_ref):
+                        price = client.get_price(body)["price"]
+                    ledger.record(order_ref, "priced", price=price)
+
+                ledger.record(order_ref, "ordering")
+                with stage_timer(client, "order", order=order_ref):
+                    created = client.create_order(body)
+            ledger.record(order_ref, "ordered", order_id=created.get("id"))
+
+    # The config.json in the repo specifies the output_folder (I'm using _PS if pan-sharpened).
+    # Named by order, as consolidated groups can fetch several images for a site at once
+    output_file = output_folder / f"{order_ref}_PS.zip"
+
+    if not (ledger.reached(order_ref, "downloaded") and output_file.exists()):
+        # Wait for the shared tracker to see the order delivered (raises if it failed)
+        with stage_timer(client, "delivery wait", order=order_ref):
+            order = tracker.track(order_ref).result()
+        ledger.record(order_ref, "delivered")
+        log(f"order {order_ref} delivered")
+
+        if remote_extract:
+            # Read the zip's directory and the one tif over Range requests
+            with stage_limits["download"], stage_timer(
+                client, "remote extract", order=order_ref
+            ):
+                delivery = client.open_url(client.get_download_link(order))
+                extracted = extract_zip_member(
+                    delivery, output_folder / "extracted_images", number_suffix
+                )
+            ledger.record(order_ref, "extracted", path=extracted)
+            if extracted is not None and catalog is not None:
+                catalog.add(extracted, image_id=img_ref)
+            log(f"extracted {extracted}")
+            return extracted
+
+        # Download the order to specified zip file
+        with stage_limits["download"], stage_timer(client, "download", order=order_ref):
+            client.download_order_to_file(order, output_file)
+        ledger.record(order_ref, "downloaded", path=output_file)
+
+    with stage_timer(client, "extract", order=order_ref):
+        extracted = process_zip_file(
+            output_file, output_folder / "extracted_images", number_suffix=number_suffix
+        )
+    ledger.record(order_ref, "extracted", path=extracted)
+    if extracted is not None and catalog is not None:
+        catalog.add(extracted, image_id=img_ref)
+    return extracted
+
+
+def process_site(
+    client,
+    tracker,
+    ledger,
+    site_id,
+    aoi,
+    search,
+    output_folder,
+    stage_limits,
+    remote_extract=False,
+    catalog=None,
+    cog_pool=None,
+    product_type="pansharpened",
+):
+    """Search, order, wait for delivery, download and extract images for one site
+
+    aoi is the site's GeoJSON geometry (EPSG:4326), used to clip the order,
+    and search() returns the opensearch results for it. stage_limits maps
+    "search", "order" and "download" to semaphores that cap how many sites can
+    be in that stage at once across workers. Delivery is awaited through the
+    OrderTracker shared by all workers. Progress is saved in the JobLedger so
+    a rerun picks up where the last one stopped. With remote_extract only the
+    selected tif is read out of the delivered zip instead of downloading the
+    whole archive. Images already in the ImageCatalog are not ordered again.
+    Given cog_pool, each extracted tif is rewritten there as a COG.
+    """
+    log = SiteLog(site_id)
+
+    image_refs = select_site_images(client, ledger, site_id, search, stage_limits)
+    if not image_refs:
+        log("no images found")
+        return
+
+    log(f"image_ids {', '.join(image_refs)} to order")
+    for i, img_ref in enumerate(image_refs):
+        extracted = fulfil_order(
+            client,
+            tracker,
+            ledger,
+            log,
+            # Add a ref to identify the order
+            f"sg_quarry_{site_id}_{i + 1}",
+            img_ref,
+            aoi,
+            site_id,
+            output_folder,
+            stage_limits,
+            remote_extract,
+            site_id=site_id,
+            catalog=catalog,
+            product_type=product_type,
+        )
+        convert_to_cog(client, cog_pool, catalog, extracted, img_ref)
+
+
+def group_order_ref(group):
+    """customerRef of a group's order: per site and choice, or per shared scene"""
+    if len(group["site_ids"]) == 1:
+        return f"sg_quarry_{group['site_ids'][0]}_{group['index'] + 1}"
+    return f"sg_scene_{group['key']}"
+
+
+def plan_orders(
+    client,
+    ledger,
+    groups,
+    quote_path,
+    budget=None,
+    catalog=None,
+    workers=8,
+    product_type="pansharpened",
+):
+    """Price every group not yet ordered at once, keeping those within budget
+
+    All order bodies are built and priced concurrently before anything is
+    ordered; prices go in the ledger (so ordering doesn't price them again)
+    and to a CSV at quote_path, and the cost per contract and site is
+    printed. Orders placed on an earlier run go ahead regardless, as do
+    images the catalog already holds, and what they cost (from the ledger)
+    counts against budget, so a rerun never spends it twice. Of the rest,
+    every site's first choice is taken before any second choice until the
+    budget is spent. Returns the groups to order.
+    """
+    from shapely.geometry import mapping
+    from oneatlas.quotes import (
+        apply_budget,
+        cost_summary,
+        format_cost_summary,
+        quote_orders,
+        write_quotes,
+    )
 
-                # Add a ref to identify the order
-                order_ref = f"sg_quarry_{id}_{i + 1}"
+    keep = []
+    orders = []
+    committed = 0.0
+    for group in groups:
+        ref = group_order_ref(group)
+        held = catalog is not None and all(
+            catalog.find(site_id, group["image_id"]) for site_id in group["site_ids"]
+        )
+        if ledger.reached(ref, "ordered"):
+            # Placed (and paid for) on an earlier run
+            committed += ledger.get(ref)["price"] or 0
+            keep.append(group)
+            continue
+        if held:
+            keep.append(group)
+            continue
+        orders.append(
+            {
+                "ref": ref,
+                "body": order_body(
+                    group["image_id"], mapping(group["aoi"]), ref, product_type
+                ),
+                "group": group,
+                "site_ids": group["site_ids"],
+                "image_id": group["image_id"],
+                "priority": group["index"],
+            }
+        )
+    with stage_timer(client, "quote", orders=len(orders)):
+        quotes = quote_orders(client, orders, workers)
+    accepted, rejected = apply_budget(
+        quotes, None if budget is None else max(0.0, budget - committed)
+    )
 
-                order_body["customerRef"] = order_ref
+    for quote in quotes:
+        if quote["price"] is None:
+            SiteLog(",".join(map(str, quote["site_ids"])))(
+                f"pricing {quote['ref']} failed: {quote['error']}"
+            )
+            continue
+        if ledger.get(quote["ref"]) is None:
+            ledger.record(
+                quote["ref"],
+                "searched",
+                site_id=",".join(map(str, quote["site_ids"])),
+                image_id=quote["image_id"],
+            )
+        ledger.record(quote["ref"], "priced", price=quote["price"])
+    write_quotes(quotes, quote_path)
+
+    print(f"{len(quotes)} orders priced, {len(keep)} already ordered or held")
+    print(format_cost_summary(cost_summary(quotes)))
+    if budget is not None:
+        accepted_summary = cost_summary(accepted)["contracts"].values()
+        spend = sum(totals["price"] for totals in accepted_summary)
+        print(
+            f"budget {budget:,.2f}: {committed:,.2f} already committed, "
+            f"{len(accepted)} orders for {spend:,.2f}, {len(rejected)} left out"
+        )
+    print(f"quote written to {quote_path}")
+    return keep + [quote["group"] for quote in accepted]
+
+
+def process_group(
+    client,
+    tracker,
+    ledger,
+    group,
+    output_folder,
+    stage_limits,
+    remote_extract=False,
+    catalog=None,
+    cog_pool=None,
+    product_type="pansharpened",
+):
+    """Order one scene for a group of sites, clipping each site's tif from it
+
+    group is an entry from consolidate_orders. A group of one is ordered
+    exactly as process_site would; a larger group is ordered once over the
+    envelope of its sites and then clipped locally to each site's AOI (as a
+    COG, in cog_pool, if one is given).
+    """
+    from shapely.geometry import mapping
+
+    site_ids = group["site_ids"]
+    if len(site_ids) == 1:
+        site_id = site_ids[0]
+        extracted = fulfil_order(
+            client,
+            tracker,
+            ledger,
+            SiteLog(site_id),
+            group_order_ref(group),
+            group["image_id"],
+            mapping(group["aoi"]),
+            site_id,
+            output_folder,
+            stage_limits,
+            remote_extract,
+            site_id=site_id,
+            catalog=catalog,
+            product_type=product_type,
+        )
+        return convert_to_cog(client, cog_pool, catalog, extracted, group["image_id"])
+
+    log = SiteLog(",".join(str(site_id) for site_id in site_ids))
+    if catalog is not None and all(
+        catalog.find(site_id, group["image_id"]) for site_id in site_ids
+    ):
+        log(f"{group['image_id']} already held for every site, skipping")
+        return
+    log(f"ordering {group['image_id']} once for {len(site_ids)} sites")
+    scene_path = fulfil_order(
+        client,
+        tracker,
+        ledger,
+        log,
+        group_order_ref(group),
+        group["image_id"],
+        mapping(group["aoi"]),
+        group["key"],
+        output_folder,
+        stage_limits,
+        remote_extract,
+        site_id=",".join(str(site_id) for site_id in site_ids),
+        catalog=catalog,
+        product_type=product_type,
+    )
+    if scene_path is None or not Path(scene_path).exists():
+        # Nothing extracted, or clipped and removed on an earlier run
+        return
+    scene_path = Path(scene_path)
+    stem = scene_path.stem.rsplit("_", 1)[0]
+    site_paths = {
+        site_id: scene_path.with_name(f"{stem}_{site_id}{scene_path.suffix}")
+        for site_id in site_ids
+    }
+    from oneatlas.raster import clip_to_aoi, to_cog
+
+    with stage_timer(client, "clip", sites=len(site_ids)):
+        if cog_pool is not None:
+            # Clip and convert every site at once, straight from the scene
+            clips = [
+                cog_pool.submit(to_cog, scene_path, path, group["site_aois"][site_id])
+                for site_id, path in site_paths.items()
+            ]
+            for clip in clips:
+                clip.result()
+        else:
+            for site_id, site_path in site_paths.items():
+                clip_to_aoi(scene_path, group["site_aois"][site_id], site_path)
+    for site_id, site_path in site_paths.items():
+        if catalog is not None:
+            catalog.add(site_path, image_id=group["image_id"])
+        log(f"clipped {site_path}")
+    scene_path.unlink()
+    if catalog is not None:
+        catalog.remove(scene_path)
+
+
+def main(
+    buffer_distance=750,
+    id_start=1,
+    id_end=None,
+    workers=1,
+    max_searches=4,
+    max_orders=2,
+    max_downloads=2,
+    ledger_path=None,
+    remote_extract=False,
+    cache_dir=None,
+    cluster_size=None,
+    consolidate=False,
+    max_order_area=100,
+    catalogue_path=None,
+    cog=False,
+    cog_workers=None,
+    rate_limits=None,
+    rate_lock=None,
+    metrics_path=None,
+    poll_interval=10,
+    delivery_timeout=None,
+    dry_run=False,
+    budget=None,
+    quote_path=None,
+    product_type="pansharpened",
+):
+    import geopandas as gpd
+    from oneatlas.aoi import (
+        SEARCH_PARAMETERS,
+        ClusteredSearch,
+        aoi_index,
+        iter_search_bodies,
+        points_to_buffer_box,
+        select_ids,
+    )
+    from oneatlas.catalog import ImageCatalog
+    from oneatlas.planning import consolidate_orders, site_orders
+    from oneatlas.results import SceneTable
 
-                client.get_price(order_body)["price"]
+    # Read local config.json to get api key and directory for outputs
+    with open("config.json", "r") as file:
+        config = json.load(file)
 
-                client.create_order(order_body)
+    api_key = config["api_key"]
 
-                status = ""
-                while status != "delivered":
+    # Request and stage timings, summarised at the end (and optionally logged)
+    metrics = Metrics(metrics_path)
+
+    # One connection per worker so threads never wait on the pool, and tokens
+    # renewed in the background so workers never wait on authentication
+    client = OneAtlasClient(
+        api_key=api_key,
+        pool_maxsize=max(10, workers),
+        background_token_refresh=True,
+        cache=ResponseCache(directory=cache_dir) if cache_dir else None,
+        # Requests per second per endpoint family, shared by all workers (and
+        # by other batch processes given the same rate_lock file)
+        rate_limiter=(
+            RateLimiter(rate_limits, lock_path=rate_lock) if rate_limits else None
+        ),
+        metrics=metrics,
+    )
 
-                    orders = client.list_orders(customerRef=order_ref)
+    output_folder = Path(config["output_dir"])
+    input_file_gdb = Path(config["input_gdb"])
 
-                    order = orders["items"][0]
+    # function to convert polygon gdf to bounding box list
+    sites_gdf = gpd.read_file(input_file_gdb, layer="Registered_Sites_Merged_v2")
 
-                    status = order["status"]
-                    time.sleep(10)
+    # Drop rows with 'POINT EMPTY' geometry
+    sites_gdf = sites_gdf[~sites_gdf.geometry.is_empty]
 
-                # The config.json in the repo specifies the output_folder (I'm using _PS if pan-sharpened)
-                output_file = output_folder / f"sg_quarry_PS_{id}.zip"
+    # convert points geometry to bounding box around 500m buffer
+    sites_box_gdf = points_to_buffer_box(sites_gdf, buffer_distance=1000)
 
-                # Download the order to specified zip file
-                client.download_order_to_file(order, output_file)
+    # id -> search geometry, built once for the whole layer
+    aois = aoi_index(sites_box_gdf, uid_column="image_id")
 
-                process_zip_file(output_file, output_folder / "extracted_images")
+    # Allow limits to image_id range processed
+    id_vals = select_ids(aois, id_start, id_end)
+    print(f"processing ids {id_vals[0]} to {id_vals[-1]} with {workers} worker(s)")
+
+    # Optionally share one search between sites in the same grid cell
+    clustered = None
+    if cluster_size:
+        in_range = sites_box_gdf[sites_box_gdf["image_id"].isin(id_vals)]
+        clustered = ClusteredSearch(
+            client, in_range, cell_size=cluster_size, **SEARCH_PARAMETERS
+        )
+        print(f"{len(id_vals)} sites in {len(clustered.clusters)} search clusters")
+
+    stage_limits = {
+        "search": threading.Semaphore(max_searches),
+        "order": threading.Semaphore(max_orders),
+        "download": threading.Semaphore(max_downloads),
+    }
+    failed = []
+    # Optionally keep every scene found in a catalogue queryable offline
+    catalogue = SceneTable() if catalogue_path else None
+    # Ledger of finished stages so reruns never repeat (or re-pay for) orders
+    if ledger_path is None:
+        ledger_path = output_folder / "batch_jobs.sqlite"
+    ledger = JobLedger(ledger_path)
+    # Orders still not delivered after delivery_timeout fail their site
+    tracker = OrderTracker(client, min_interval=poll_interval, timeout=delivery_timeout)
+    # What is already extracted, so images held from any earlier run are skipped
+    image_catalog = ImageCatalog(output_folder / "extracted_images")
+    # Optionally rewrite extracted tifs as COGs, off the worker threads. Spawned
+    # rather than forked, as the batch is already running threads by then
+    cog_pool = None
+    # Quoting (or capping spend) needs every site's images chosen before ordering
+    planned = consolidate or dry_run or budget is not None
+    if cog and not dry_run:
+        cog_pool = ProcessPoolExecutor(
+            max_workers=cog_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    with client, tracker, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for id, aoi, search_body in iter_search_bodies(aois, id_vals):
+            if clustered is not None:
+                search = partial(clustered.results_for, id)
+            else:
+                search = partial(client.search, search_body)
+            if catalogue is not None:
+                search = record_results(search, catalogue)
+            if planned:
+                # Only choose images for now; orders are planned across all sites
+                futures[id] = executor.submit(
+                    select_site_images, client, ledger, id, search, stage_limits
+                )
+                continue
+            futures[id] = executor.submit(
+                process_site,
+                client,
+                tracker,
+                ledger,
+                id,
+                aoi,
+                search,
+                output_folder,
+                stage_limits,
+                remote_extract,
+                image_catalog,
+                cog_pool,
+                product_type,
+            )
+        selections = {}
+        for id, future in futures.items():
+            try:
+                selections[id] = future.result()
+            except Exception as e:
+                SiteLog(id)(f"failed: {e!r}")
+                failed.append(id)
+
+        groups = []
+        if consolidate:
+            groups = consolidate_orders(
+                {id: refs for id, refs in selections.items() if refs},
+                {id: aois[id] for id in selections},
+                max_area_km2=max_order_area,
+            )
+            n_orders = sum(len(refs) for refs in selections.values())
+            print(f"{n_orders} site images consolidated into {len(groups)} orders")
+        elif planned:
+            groups = site_orders(
+                {id: refs for id, refs in selections.items() if refs},
+                {id: aois[id] for id in selections},
+            )
+        if dry_run or budget is not None:
+            groups = plan_orders(
+                client,
+                ledger,
+                groups,
+                quote_path or output_folder / "order_quote.csv",
+                budget=budget,
+                catalog=image_catalog,
+                workers=max(workers, max_orders),
+                product_type=product_type,
+            )
+        if dry_run:
+            print("dry run, nothing ordered")
+            groups = []
+        if groups:
+            group_futures = [
+                (
+                    group,
+                    executor.submit(
+                        process_group,
+                        client,
+                        tracker,
+                        ledger,
+                        group,
+                        output_folder,
+                        stage_limits,
+                        remote_extract,
+                        image_catalog,
+                        cog_pool,
+                        product_type,
+                    ),
+                )
+                for group in groups
+            ]
+            for group, future in group_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    SiteLog(",".join(map(str, group["site_ids"])))(f"failed: {e!r}")
+                    failed.extend(group["site_ids"])
+    if cog_pool is not None:
+        cog_pool.shutdown()
+    if failed:
+        print(f"failed ids: {', '.join(str(i) for i in failed)}")
+    if catalogue is not None:
+        catalogue.drop_duplicates().to_parquet(catalogue_path)
+        print(f"{len(catalogue)} search results saved to {catalogue_path}")
+    if clustered is not None:
+        print(f"{clustered.searches} cluster searches made")
+    if client.rate_limiter is not None:
+        print(f"rate limiting: {client.rate_limit_stats}")
+    print(f"orders per stage: {ledger.summary()}")
+    ledger.close()
+    print(metrics.format_summary())
+    metrics.close()
 
 
 if __name__ == "__main__":
@@ -238,11 +798,182 @@ if __name__ == "__main__":
         default=None,
         help="End ID for processing images (optional).",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of sites processed concurrently.",
+    )
+    parser.add_argument(
+        "--max_searches",
+        type=int,
+        default=4,
+        help="Maximum concurrent search requests.",
+    )
+    parser.add_argument(
+        "--max_orders",
+        type=int,
+        default=2,
+        help="Maximum concurrent price/order requests.",
+    )
+    parser.add_argument(
+        "--max_downloads",
+        type=int,
+        default=2,
+        help="Maximum concurrent order downloads.",
+    )
+
+    parser.add_argument(
+        "-l",
+        "--ledger",
+        default=None,
+        help="SQLite job ledger used to resume runs (default <output_dir>/batch_jobs.sqlite).",
+    )
+
+    parser.add_argument(
+        "-r",
+        "--remote_extract",
+        action="store_true",
+        help="Stream only the largest tif out of each delivery instead of downloading the zip.",
+    )
+
+    parser.add_argument(
+        "-c",
+        "--cache_dir",
+        default=None,
+        help="Folder caching search and price responses for a day (optional).",
+    )
+
+    parser.add_argument(
+        "-g",
+        "--cluster_size",
+        type=int,
+        default=None,
+        help="Grid cell size in meters; sites in one cell share a single search (optional).",
+    )
+
+    parser.add_argument(
+        "--consolidate",
+        action="store_true",
+        help="Order each scene chosen by several sites once and clip per site locally.",
+    )
+    parser.add_argument(
+        "--max_order_area",
+        type=float,
+        default=100,
+        help="Largest merged order AOI in square km when consolidating.",
+    )
+
+    parser.add_argument(
+        "--catalogue",
+        default=None,
+        help="Parquet file to save all search results to (optional).",
+    )
+
+    parser.add_argument(
+        "--cog",
+        action="store_true",
+        help="Rewrite extracted tifs as Cloud Optimized GeoTIFFs with overviews.",
+    )
+    parser.add_argument(
+        "--cog_workers",
+        type=int,
+        default=None,
+        help="Processes converting to COG (default: one per CPU).",
+    )
+
+    parser.add_argument(
+        "--rate_limits",
+        nargs="+",
+        default=None,
+        metavar="FAMILY=RATE",
+        help="Requests per second allowed per endpoint family, e.g. search=5 data=10 (auth, search, data, download).",
+    )
+    parser.add_argument(
+        "--rate_lock",
+        default=None,
+        help="File through which concurrent batch processes share the rate limits (optional).",
+    )
+
+    parser.add_argument(
+        "-m",
+        "--metrics",
+        default=None,
+        help="JSON lines file to append every request and stage timing to (optional).",
+    )
+
+    parser.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Choose images and price every order, writing the quote, without ordering anything.",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Price every order first and only place those fitting within this total (optional).",
+    )
+    parser.add_argument(
+        "--quote",
+        default=None,
+        help="CSV file the order quote is written to (default <output_dir>/order_quote.csv).",
+    )
+    parser.add_argument(
+        "--product_type",
+        default="pansharpened",
+        choices=["pansharpened", "multiSpectral"],
+        help="Product ordered (and priced) for every image.",
+    )
+
+    parser.add_argument(
+        "--poll_interval",
+        type=float,
+        default=10,
+        help="Seconds between order status sweeps while orders are changing.",
+    )
+    parser.add_argument(
+        "--delivery_timeout",
+        type=float,
+        default=None,
+        help="Seconds to wait for an order to be delivered before failing its site (default no limit).",
+    )
 
     # Parse the arguments
     args = parser.parse_args()
 
     # Call the main function with the parsed arguments
     main(
-        buffer_distance=args.buffer_distance, id_start=args.id_start, id_end=args.id_end
+        buffer_distance=args.buffer_distance,
+        id_start=args.id_start,
+        id_end=args.id_end,
+        workers=args.workers,
+        max_searches=args.max_searches,
+        max_orders=args.max_orders,
+        max_downloads=args.max_downloads,
+        ledger_path=args.ledger,
+        remote_extract=args.remote_extract,
+        cache_dir=args.cache_dir,
+        cluster_size=args.cluster_size,
+        consolidate=args.consolidate,
+        max_order_area=args.max_order_area,
+        catalogue_path=args.catalogue,
+        cog=args.cog,
+        cog_workers=args.cog_workers,
+        rate_limits=(
+            {
+                family: float(rate)
+                for family, rate in (limit.split("=") for limit in args.rate_limits)
+            }
+            if args.rate_limits
+            else None
+        ),
+        rate_lock=args.rate_lock,
+        metrics_path=args.metrics,
+        poll_interval=args.poll_interval,
+        delivery_timeout=args.delivery_timeout,
+        dry_run=args.dry_run,
+        budget=args.budget,
+        quote_path=args.quote,
+        product_type=args.product_type,
     )
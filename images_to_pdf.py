@@ -0,0 +1,250 @@
+"""Render extracted images to PDF, one page per tif
+
+Pages are rendered in a process pool from rasters read at page resolution
+(rasterio out_shape, so GDAL uses overviews when the tif has them) and handed
+to reportlab in memory. Run from the repo root, e.g.
+
+    python images_to_pdf.py --workers 4
+
+which writes one pdf per site id to the output_dir in config.json.
+"""
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4, A3
+from reportlab.lib.utils import ImageReader
+from matplotlib.figure import Figure
+import rasterio as rio
+from rasterio.enums import ColorInterp, Resampling
+from rasterio.plot import show
+from matplotlib_scalebar.scalebar import ScaleBar
+import geopandas as gpd
+from oneatlas.catalog import ImageCatalog, site_lookup, site_sort_key
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import argparse
+import json
+import time
+
+
+def page_title(sites, site_id, acquired):
+    """<id> - <business name> (<date>), using a site_lookup dict"""
+    formatted_date = acquired.strftime("%d %b %Y") if acquired else "Unknown Date"
+    site = sites.get(site_id)
+    if site is not None:
+        return f"{site_id} - {site['USER_Name_of_business']} ({formatted_date})"
+    return f"{site_id} ({formatted_date})"
+
+
+def read_for_page(image_path, max_pixels):
+    """Raster bands decimated to at most max_pixels a side, and the pixel size
+
+    Reading with out_shape lets GDAL pick the closest overview (or decimate
+    while reading) rather than loading the full-resolution scene.
+    """
+    with rio.open(image_path) as src:
+        scale = min(1.0, max_pixels / max(src.width, src.height))
+        height = max(1, round(src.height * scale))
+        width = max(1, round(src.width * scale))
+        # Same bands rasterio.plot.show(src) would pick: RGB if labelled, else band 1
+        colorinterp = dict(zip(src.colorinterp, src.indexes))
+        rgb = (ColorInterp.red, ColorInterp.green, ColorInterp.blue)
+        if src.count > 1 and all(ci in colorinterp for ci in rgb):
+            indexes = [colorinterp[ci] for ci in rgb]
+        else:
+            indexes = [1]
+        data = src.read(
+            indexes,
+            out_shape=(len(indexes), height, width),
+            resampling=Resampling.average,
+            masked=True,
+        )
+        pixel_size = src.res[0] * src.width / width
+    return data, pixel_size
+
+
+def render_page(image_path, title, size_inches=18, dpi=100):
+    """PNG bytes of one titled page with a scale bar (runs in a worker process)"""
+    data, pixel_size = read_for_page(image_path, size_inches * dpi)
+
+    # A bare Figure needs no pyplot backend and is never kept in a global registry
+    fig = Figure(figsize=(size_inches, size_inches))
+    ax = fig.subplots()
+    ax.set_title(title, pad=20)
+    show(data, ax=ax)
+
+    # Add a scale bar
+    scalebar = ScaleBar(pixel_size, units="m", location="lower right")
+    ax.add_artist(scalebar)
+
+    ax.set_axis_off()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi)
+    return buffer.getvalue()
+
+
+def draw_page(c, png, page_size, margin=10, width=None, height=None):
+    """Draw PNG bytes centred on the page, fitted within the margins"""
+    page_width, page_height = page_size
+    image = ImageReader(BytesIO(png))
+    img_width, img_height = image.getSize()
+
+    if width is None:
+        # Calculate the image size to fit in the PDF while preserving aspect ratio
+        max_width = page_width - (2 * margin)
+        max_height = page_height - (2 * margin)
+
+        aspect_ratio = img_width / img_height
+        if (max_width / max_height) > aspect_ratio:
+            width = aspect_ratio * max_height
+            height = max_height
+        else:
+            width = max_width
+            height = width / aspect_ratio
+
+    x_position = (page_width - width) / 2
+    y_position = (page_height - height) / 2
+
+    # Draw the image centered on the page
+    c.drawImage(
+        image,
+        x_position,
+        y_position,
+        width=width,
+        height=height,
+        preserveAspectRatio=True,
+    )
+    c.showPage()
+
+
+def pdf_per_image_id(
+    images_folder, pdf_dir, gdf, workers=None, size_inches=18, dpi=100
+):
+    """Create one pdf for all tifs of image id
+
+    Image id is the id part at the end of the file name <file name>_<id>.tif.
+    Every page is rendered in a pool of `workers` processes; each pdf is written
+    as soon as all of its pages are ready.
+    """
+    start = time.perf_counter()
+    # Files and site attributes are each indexed once, not per page
+    catalog = ImageCatalog(images_folder)
+    sites = site_lookup(gdf)
+
+    pdf_paths = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pages = {}
+        for image_id, entries in sorted(
+            catalog.by_site().items(), key=lambda item: site_sort_key(item[0])
+        ):
+            # entries are newest first
+            pages[image_id] = [
+                executor.submit(
+                    render_page,
+                    entry["path"],
+                    page_title(sites, image_id, entry["acquired"]),
+                    size_inches,
+                    dpi,
+                )
+                for entry in entries
+            ]
+
+        for image_id, futures in pages.items():
+            pdf_path = Path(pdf_dir) / f"pleiades_quarry_id_{image_id}.pdf"
+            c = canvas.Canvas(str(pdf_path), pagesize=A3)
+            for future in futures:
+                draw_page(c, future.result(), A3)
+            c.save()
+            pdf_paths.append(pdf_path)
+            print(
+                f"{pdf_path.name}: {len(futures)} page(s), "
+                f"{time.perf_counter() - start:.1f}s elapsed"
+            )
+
+    print(
+        f"{len(catalog)} images to {len(pdf_paths)} pdfs "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return pdf_paths
+
+
+def add_images_to_pdf(images_folder, pdf_path, gdf, workers=None):
+    """Plot all images in a directory to PDF"""
+    start = time.perf_counter()
+    catalog = ImageCatalog(images_folder)
+    sites = site_lookup(gdf)
+    # Site ids in numeric order, as the notebook sorted its files
+    entries = sorted(catalog, key=lambda entry: site_sort_key(entry["site_id"]))
+    paths = [entry["path"] for entry in entries]
+    titles = [
+        page_title(sites, entry["site_id"], entry["acquired"]) for entry in entries
+    ]
+
+    c = canvas.Canvas(str(pdf_path), pagesize=A4)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map keeps page order while rendering ahead in the pool
+        for png in executor.map(render_page, paths, titles, [9] * len(paths)):
+            draw_page(c, png, A4, width=9 * 72, height=9 * 72)
+    c.save()
+    print(f"{len(paths)} images to {pdf_path} in {time.perf_counter() - start:.1f}s")
+    return pdf_path
+
+
+def main(workers=None, single=False, images_folder=None, pdf_dir=None):
+    # Get images directory and centre point layer for plot title info
+    with open("config.json", "r") as file:
+        config = json.load(file)
+
+    output_folder = Path(config["output_dir"])
+    input_file_gdb = Path(config["input_gdb"])
+
+    sites_gdf = gpd.read_file(input_file_gdb, layer="Registered_Sites_Merged_v2")
+
+    # Directory of images
+    images_folder = Path(images_folder or output_folder / "extracted_images")
+    pdf_dir = Path(pdf_dir or output_folder)
+
+    if single:
+        return add_images_to_pdf(
+            images_folder, pdf_dir / "output_images.pdf", sites_gdf, workers
+        )
+    return pdf_per_image_id(images_folder, pdf_dir, sites_gdf, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render extracted images to PDF, one page per image."
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes rendering pages (default: one per CPU).",
+    )
+    parser.add_argument(
+        "-i",
+        "--images_folder",
+        default=None,
+        help="Folder of tifs (default <output_dir>/extracted_images).",
+    )
+    parser.add_argument(
+        "-o",
+        "--pdf_dir",
+        default=None,
+        help="Folder the pdfs are written to (default <output_dir>).",
+    )
+    parser.add_argument(
+        "--single",
+        action="store_true",
+        help="Write every image into one output_images.pdf instead of one pdf per id.",
+    )
+
+    args = parser.parse_args()
+    main(
+        workers=args.workers,
+        single=args.single,
+        images_folder=args.images_folder,
+        pdf_dir=args.pdf_dir,
+    )
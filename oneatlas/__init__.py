@@ -1 +1,10 @@
-from .oneatlas import OneAtlasClient
\ No newline at end of file
+from .oneatlas import OneAtlasClient
+from .retry import RetryPolicy
+from .orders import OrderTracker, OrderFailed
+from .ledger import JobLedger
+from .download import RangedDownload, DownloadError
+from .tokens import TokenManager
+from .cache import ResponseCache
+from .ratelimit import RateLimiter
+from .metrics import Metrics
+from .quicklooks import QuicklookManager
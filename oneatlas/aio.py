@@ -0,0 +1,351 @@
+"""asyncio counterpart of OneAtlasClient, requires aiohttp
+
+async with AsyncOneAtlasClient(api_key, max_concurrency=50) as client:
+    results = await asyncio.gather(*(client.search(body) for body in bodies))
+"""
+
+import asyncio
+import os
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    raise ImportError(
+        "AsyncOneAtlasClient requires aiohttp, install it with `pip install aiohttp`"
+    )
+
+from .download import BUFFER_SIZE
+from .oneatlas import OneAtlasClient
+from .retry import RetryPolicy
+
+# Raised before anything reached the server; connect timeouts have had their
+# own class since aiohttp 3.10
+_CONNECT_ERRORS = (
+    aiohttp.ClientConnectorError,
+    getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ClientConnectorError),
+)
+
+
+class AsyncAuth:
+    async def create_api_key(self, description=None):
+        return await self._request_json(
+            "POST",
+            f"{self.AUTH_URL}/api/v1/apikeys",
+            client_id=self.CLIENT_ID_AAA,
+            json={"description": description},
+        )
+
+    async def delete_api_keys(self):
+        await self._request_json(
+            "DELETE", f"{self.AUTH_URL}/api/v1/apikeys", client_id=self.CLIENT_ID_AAA
+        )
+
+    async def list_api_keys(self):
+        return await self._request_json(
+            "GET", f"{self.AUTH_URL}/api/v1/apikeys", client_id=self.CLIENT_ID_AAA
+        )
+
+
+class AsyncData:
+    async def create_order(self, body):
+        return await self._request_json(
+            "POST", f"{self.DATA_URL}/api/v1/orders", json=body
+        )
+
+    async def download_order_to_file(self, order, download_path):
+        download_link = OneAtlasClient.get_download_link(order)
+        await self.download_url_to_file(download_link, download_path)
+        print(f"Downloaded to {download_path}")
+
+    async def get_account_information(self):
+        return await self._request_json("GET", f"{self.DATA_URL}/api/v1/me")
+
+    async def get_contract(self, contract_id):
+        return await self._request_json(
+            "GET", f"{self.DATA_URL}/api/v1/contracts/{contract_id}"
+        )
+
+    async def get_contract_subscription(self, contract_id, subscription_id):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/contracts/{contract_id}/subscriptions/{subscription_id}",
+        )
+
+    async def get_contract_payment(self, contract_id, payment_id):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/contracts/{contract_id}/payments/{payment_id}",
+        )
+
+    async def get_order(self, order_id):
+        return await self._request_json(
+            "GET", f"{self.DATA_URL}/api/v1/orders/{order_id}"
+        )
+
+    async def get_price(self, body):
+        return await self._request_json(
+            "POST", f"{self.DATA_URL}/api/v1/prices", json=body, idempotent=True
+        )
+
+    async def list_analytics(self, page=1, items_per_page=10):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/analytics",
+            params={"page": page, "itemsPerPage": items_per_page},
+        )
+
+    async def list_contracts(self, page=1, items_per_page=10):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/contracts",
+            params={"page": page, "itemsPerPage": items_per_page},
+        )
+
+    async def list_contract_payments(self, contract_id, page=1, items_per_page=10):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/contracts/{contract_id}/payments",
+            params={"page": page, "itemsPerPage": items_per_page},
+        )
+
+    async def list_contract_subscriptions(
+        self, contract_id, page=1, items_per_page=10, type=None
+    ):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/contracts/{contract_id}/subscriptions",
+            params={"page": page, "itemsPerPage": items_per_page, "type": type},
+        )
+
+    async def list_orders(
+        self, status=None, kind=None, customerRef=None, page=1, items_per_page=10
+    ):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/orders",
+            params={
+                "status": status,
+                "kind": kind,
+                "customerRef": customerRef,
+                "page": page,
+                "itemsPerPage": items_per_page,
+            },
+        )
+
+    async def list_subscription_payments(
+        self, subscription_id, page=1, items_per_page=10
+    ):
+        return await self._request_json(
+            "GET",
+            f"{self.DATA_URL}/api/v1/subscriptions/{subscription_id}/payments",
+            params={"page": page, "itemsPerPage": items_per_page},
+        )
+
+    async def get_user_roles(self):
+        return await self._request_json("GET", f"{self.DATA_URL}/api/v1/me/services")
+
+    async def revoke_subscription(self, subscription_id):
+        return await self._request_json(
+            "GET", f"{self.DATA_URL}/api/v1/{subscription_id}/revoke"
+        )
+
+
+class AsyncSearch:
+    async def search(self, body):
+        return await self._request_json(
+            "POST", f"{self.SEARCH_URL}/api/v2/opensearch", json=body, idempotent=True
+        )
+
+    async def download_quicklook_to_file(self, scene, download_path):
+        try:
+            quicklook_link = scene["_links"]["quicklook"]["href"]
+        except KeyError:
+            raise ValueError(
+                'Invalid scene provided; the entire scene is required, { "_links": {...}, "geometry": ...}'
+            )
+        await self.download_url_to_file(quicklook_link, download_path)
+
+
+class AsyncOneAtlasClient(AsyncAuth, AsyncData, AsyncSearch):
+    """Same API surface as OneAtlasClient, as coroutines over one aiohttp session
+
+    max_concurrency caps the requests in flight across every coroutine using
+    the client; the connection pool is sized to match. Retries are decided
+    by the same RetryPolicy as the blocking client (should_retry/next_delay).
+    """
+
+    CLIENT_ID_AAA = OneAtlasClient.CLIENT_ID_AAA
+    CLIENT_ID_IDP = OneAtlasClient.CLIENT_ID_IDP
+
+    AUTH_URL = OneAtlasClient.AUTH_URL
+    DATA_URL = OneAtlasClient.DATA_URL
+    SEARCH_URL = OneAtlasClient.SEARCH_URL
+
+    def __init__(
+        self,
+        api_key=None,
+        max_concurrency=50,
+        limit_per_host=None,
+        timeout=60,
+        retry=None,
+        token_refresh_margin=60,
+    ):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host or max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=10, sock_read=timeout
+        )
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.token_refresh_margin = token_refresh_margin
+        self._tokens = {}
+        self._token_locks = {}
+        self._semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """Create the session; called automatically on first use"""
+        if self.session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_concurrency, limit_per_host=self.limit_per_host
+                ),
+                timeout=self.timeout,
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _authenticate(self, client_id=None):
+        return await self._request_json(
+            "POST",
+            f"{self.AUTH_URL}/auth/realms/IDP/protocol/openid-connect/token",
+            client_id=None,
+            data={
+                "apikey": self.api_key,
+                "client_id": client_id,
+                "grant_type": "api_key",
+            },
+            idempotent=True,
+        )
+
+    async def _access_token(self, client_id=None):
+        token = self._tokens.get(client_id)
+        if (
+            token is None
+            or token["expires_at"] - self.token_refresh_margin < time.time()
+        ):
+            # One refresh per client id however many coroutines need the token
+            lock = self._token_locks.setdefault(client_id, asyncio.Lock())
+            async with lock:
+                token = self._tokens.get(client_id)
+                if (
+                    token is None
+                    or token["expires_at"] - self.token_refresh_margin < time.time()
+                ):
+                    response = await self._authenticate(client_id)
+                    token = self._tokens[client_id] = {
+                        "access_token": response["access_token"],
+                        "expires_at": time.time() + response["expires_in"],
+                    }
+        return {"Authorization": "Bearer " + token["access_token"]}
+
+    async def _send(self, method, url, client_id, idempotent, handle, **kwargs):
+        """Send a request under the concurrency limit with retries, returning handle(response)"""
+        await self.open()
+        if idempotent is None:
+            idempotent = method in RetryPolicy.IDEMPOTENT_METHODS
+        if "params" in kwargs:
+            # aiohttp rejects None values, requests drops them
+            kwargs["params"] = {
+                k: v for k, v in kwargs["params"].items() if v is not None
+            }
+        self.retry.record("requests")
+        attempt = 1
+        while True:
+            headers = await self._access_token(client_id) if client_id else {}
+            try:
+                async with self._semaphore:
+                    async with self.session.request(
+                        method, url, headers=headers, **kwargs
+                    ) as response:
+                        if not self.retry.should_retry(
+                            response.status, idempotent, attempt
+                        ):
+                            response.raise_for_status()
+                            return await handle(response)
+                        delay = self.retry.next_delay(
+                            attempt, response.status, response
+                        )
+            except aiohttp.ClientConnectionError as e:
+                if not self.retry.should_retry(
+                    e, idempotent, attempt, never_sent=self._never_sent(e)
+                ):
+                    raise
+                delay = self.retry.next_delay(attempt, e)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _never_sent(error):
+        # Failed to connect (refused, DNS, connect timeout): nothing reached the server
+        return isinstance(error, _CONNECT_ERRORS)
+
+    async def _request_json(
+        self, method, url, client_id=CLIENT_ID_IDP, idempotent=None, **kwargs
+    ):
+        async def read_json(response):
+            if response.content_length == 0:
+                return None
+            return await response.json(content_type=None)
+
+        return await self._send(method, url, client_id, idempotent, read_json, **kwargs)
+
+    async def download_url_to_file(
+        self, url, path, params=None, buffer_size=BUFFER_SIZE
+    ):
+        """Stream url to <path>.part and rename once complete"""
+        part_path = f"{path}.part"
+
+        async def write_file(response):
+            # File I/O runs in the default executor so a slow disk never stalls
+            # the other coroutines; chunks are gathered up to buffer_size so
+            # there is one hop per buffer rather than per network read
+            f = await asyncio.to_thread(open, part_path, "wb")
+            try:
+                pending = bytearray()
+                async for chunk in response.content.iter_chunked(buffer_size):
+                    pending += chunk
+                    if len(pending) >= buffer_size:
+                        data, pending = pending, bytearray()
+                        await asyncio.to_thread(f.write, data)
+                if pending:
+                    await asyncio.to_thread(f.write, pending)
+            finally:
+                await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, part_path, path)
+            return path
+
+        return await self._send(
+            "GET",
+            url,
+            self.CLIENT_ID_IDP,
+            None,
+            write_file,
+            params=params or {},
+        )
+
+    @property
+    def retry_stats(self):
+        return self.retry.stats
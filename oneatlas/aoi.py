@@ -0,0 +1,181 @@
+"""Vectorised preparation of site AOIs and their search bodies, requires geopandas"""
+
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+
+SEARCH_PARAMETERS = {
+    "cloudCover": "[0,30]",
+    "incidenceAngle": "[0,40]",
+    "processingLevel": "SENSOR",
+    "relation": "contains",
+    "constellation": "PHR",
+}
+
+
+def points_to_buffer_box(gdf, buffer_distance=500, epsg=27700):
+    """Buffer points by distance and convert to bounding boxes
+
+    The box around a buffered point is just x/y +- distance, so boxes are
+    built straight from the coordinate arrays without making any circles.
+    """
+    # Check if all geometries are Points
+    if not (gdf.geometry.geom_type == "Point").all():
+        print("All geometries in the GeoDataFrame must be Points. Exiting.")
+        return None
+    gdf = gdf.to_crs(epsg=epsg)
+    x = gdf.geometry.x.to_numpy()
+    y = gdf.geometry.y.to_numpy()
+    gdf["geometry"] = shapely.box(
+        x - buffer_distance,
+        y - buffer_distance,
+        x + buffer_distance,
+        y + buffer_distance,
+    )
+    return gdf
+
+
+def aoi_index(gdf, uid_column="image_id", epsg=4326):
+    """Dict of uid -> geometry (reprojected for searching) built in one pass"""
+    if not gdf[uid_column].is_unique:
+        raise ValueError(f"Values in '{uid_column}' are not unique.")
+    geometries = gdf.geometry.to_crs(epsg=epsg).to_numpy()
+    return dict(zip(gdf[uid_column].tolist(), geometries))
+
+
+def select_ids(index, id_start=None, id_end=None):
+    """Ids in the index within the optional inclusive range, in layer order"""
+    return [
+        uid
+        for uid in index
+        if (id_start is None or uid >= id_start) and (id_end is None or uid <= id_end)
+    ]
+
+
+def search_body(geometry, **parameters):
+    """Opensearch body for an AOI geometry (shapely or GeoJSON mapping)"""
+    if not isinstance(geometry, dict):
+        geometry = mapping(geometry)
+    return {**SEARCH_PARAMETERS, **parameters, "geometry": geometry}
+
+
+def iter_search_bodies(index, ids=None, **parameters):
+    """Lazily yield (id, GeoJSON geometry, search body) for each id
+
+    GeoJSON is only built for the ids actually consumed, so a run over a small
+    id range of a large site layer does no work for the rest.
+    """
+    for uid in index if ids is None else ids:
+        geometry = mapping(index[uid])
+        yield uid, geometry, search_body(geometry, **parameters)
+
+
+def cluster_aois(gdf, cell_size=10000, uid_column="image_id"):
+    """Group AOIs by the grid cell their centre falls in, {cell: [uid, ...]}
+
+    gdf should be in a projected CRS (e.g. the EPSG:27700 boxes) so cell_size
+    is in metres.
+    """
+    bounds = gdf.geometry.bounds.to_numpy()
+    cells = np.floor(
+        np.column_stack(
+            [(bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2]
+        )
+        / cell_size
+    ).astype(np.int64)
+    clusters = {}
+    for cell, uid in zip(map(tuple, cells), gdf[uid_column].tolist()):
+        clusters.setdefault(cell, []).append(uid)
+    return clusters
+
+
+def assign_scenes(features, site_geometries):
+    """{uid: [feature, ...]} of the scenes whose footprint contains each site
+
+    features are opensearch result features and site_geometries a dict of
+    uid -> shapely geometry in the same CRS (EPSG:4326).
+    """
+    uids = list(site_geometries)
+    assigned = {uid: [] for uid in uids}
+    if not features or not uids:
+        return assigned
+    tree = shapely.STRtree(list(site_geometries.values()))
+    footprints = [shapely.geometry.shape(f["geometry"]) for f in features]
+    scene_idx, site_idx = tree.query(footprints, predicate="contains")
+    for scene, site in zip(scene_idx, site_idx):
+        assigned[uids[site]].append(features[scene])
+    return assigned
+
+
+class ClusteredSearch:
+    """Share one search between neighbouring sites
+
+    Sites are clustered on a grid of cell_size metres; the first time any site
+    in a cluster asks for results, one "intersects" search is made over the
+    cluster's envelope (all pages of it) and the scenes are shared out to each
+    site whose box the scene footprint contains, matching what a per-site
+    "contains" search returns. Safe to call from many threads.
+
+        clustered = ClusteredSearch(client, boxes_27700, cell_size=20000)
+        results = clustered.results_for(site_id)  # {"features": [...]}
+    """
+
+    def __init__(
+        self,
+        client,
+        gdf,
+        cell_size=10000,
+        uid_column="image_id",
+        items_per_page=500,
+        **parameters,
+    ):
+        self.client = client
+        self.items_per_page = items_per_page
+        self.parameters = {**parameters, "relation": "intersects"}
+        self.clusters = cluster_aois(gdf, cell_size, uid_column)
+        self.sites = aoi_index(gdf, uid_column)
+        self._cluster_of = {
+            uid: cell for cell, uids in self.clusters.items() for uid in uids
+        }
+        self._results = {}
+        self._lock = threading.Lock()
+        self.searches = 0
+
+    def results_for(self, uid):
+        cell = self._cluster_of[uid]
+        with self._lock:
+            future = self._results.get(cell)
+            owner = future is None
+            if owner:
+                future = self._results[cell] = Future()
+        if owner:
+            try:
+                future.set_result(self._search_cluster(cell))
+            except Exception as e:
+                future.set_exception(e)
+        return {"features": future.result()[uid]}
+
+    def _search_cluster(self, cell):
+        sites = {uid: self.sites[uid] for uid in self.clusters[cell]}
+        envelope = shapely.envelope(shapely.union_all(list(sites.values())))
+        body = search_body(envelope, **self.parameters)
+        features = []
+        page = 1
+        while True:
+            body.update(itemsPerPage=self.items_per_page, startPage=page)
+            results = self.client.search(body)
+            # Several clusters are searched at once from the batch's workers
+            with self._lock:
+                self.searches += 1
+            features.extend(results.get("features", []))
+            total = results.get("totalResults", len(features))
+            if (
+                len(results.get("features", [])) < self.items_per_page
+                or len(features) >= total
+            ):
+                break
+            page += 1
+        return assign_scenes(features, sites)
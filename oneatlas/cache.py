@@ -0,0 +1,162 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ResponseCache:
+    """In-memory LRU of API responses, optionally backed by a directory of JSON files
+
+    Entries are keyed on the endpoint plus the canonical JSON of the request
+    body, so dicts built in a different key order still hit. Entries older than
+    ttl seconds are ignored. The memory tier holds at most max_entries and the
+    disk tier at most max_disk_entries, dropping the least recently used first.
+    Files on disk are counted as they are written; once over the limit the
+    directory is scanned and trimmed to 90% of it, outside the lock, so
+    lookups never wait on a scan and scans stay rare.
+
+        client = OneAtlasClient(api_key, cache=ResponseCache(directory="cache"))
+    """
+
+    def __init__(
+        self, ttl=24 * 3600, max_entries=1000, directory=None, max_disk_entries=10000
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicting = threading.Lock()
+        self._disk_entries = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._disk_entries = sum(1 for _ in self.directory.glob("*.json"))
+
+    @staticmethod
+    def key(endpoint, body=None):
+        canonical = json.dumps(
+            [endpoint, body], sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+        # Files are replaced atomically, so they can be read without the lock
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is not None:
+                self._remember(key, entry)
+                self.stats["disk_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+        return None if entry is None else copy.deepcopy(entry[1])
+
+    def set(self, key, value):
+        entry = (time.time(), copy.deepcopy(value))
+        with self._lock:
+            self._remember(key, entry)
+        if self._write_disk(key, entry):
+            self._evict_disk()
+
+    def get_or_fetch(self, endpoint, body, fetch):
+        """Cached response for endpoint/body, calling fetch() on a miss"""
+        key = self.key(endpoint, body)
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.directory is not None:
+                for path in self.directory.glob("*.json"):
+                    path.unlink(missing_ok=True)
+                self._disk_entries = 0
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _read_disk(self, key, now):
+        if self.directory is None:
+            return None
+        path = self.directory / f"{key}.json"
+        try:
+            with open(path, "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - stored["stored_at"] >= self.ttl:
+            try:
+                path.unlink()
+            except OSError:
+                return None
+            with self._lock:
+                self._disk_entries -= 1
+            return None
+        # Touch so disk eviction drops the least recently used files first
+        os.utime(path)
+        return stored["stored_at"], stored["value"]
+
+    def _write_disk(self, key, entry):
+        """Store entry on disk; True if the disk tier is now over its limit"""
+        if self.directory is None:
+            return False
+        path = self.directory / f"{key}.json"
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"stored_at": entry[0], "value": entry[1]}, f)
+        added = not path.exists()
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_entries += added
+            return self._disk_entries > self.max_disk_entries
+
+    def _evict_disk(self):
+        # One thread scans at a time; the others carry on rather than queue
+        if not self._evicting.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                counted = self._disk_entries
+            files = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    files.append((path.stat().st_mtime, path))
+                except OSError:
+                    # Removed since the glob, by another thread or process
+                    pass
+            evict = []
+            if len(files) > self.max_disk_entries:
+                files.sort()
+                keep = self.max_disk_entries - self.max_disk_entries // 10
+                evict = [path for _, path in files[: len(files) - keep]]
+            for path in evict:
+                path.unlink(missing_ok=True)
+            with self._lock:
+                # Recount from the scan, which also picks up other processes'
+                # files, keeping what was written meanwhile: the count may run
+                # high, bringing the next scan forward, but never low
+                written = self._disk_entries - counted
+                self._disk_entries = len(files) - len(evict) + max(0, written)
+                self.stats["evictions"] += len(evict)
+        finally:
+            self._evicting.release()
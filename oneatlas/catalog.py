@@ -0,0 +1,178 @@
+"""Index of extracted images and their sites, requires rasterio"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Pléiades/SPOT product names carry the acquisition time as YYYYMMDDHHMMSS[F...]
+_DATETIME = re.compile(r"(?<!\d)(\d{14})(\d{0,6})(?!\d)")
+
+
+def parse_image_name(path):
+    """(site id, acquisition datetime or None) from <product name>_<site id>.tif"""
+    stem = Path(path).stem
+    name, _, site_id = stem.rpartition("_")
+    match = _DATETIME.search(name)
+    acquired = None
+    if match:
+        whole, fraction = match.groups()
+        try:
+            acquired = datetime.strptime(whole, "%Y%m%d%H%M%S")
+        except ValueError:
+            # 14 digits that aren't a timestamp leave the date unknown
+            pass
+        if acquired and fraction:
+            acquired = acquired.replace(microsecond=int(fraction.ljust(6, "0")))
+    return int(site_id) if site_id.isdigit() else site_id, acquired
+
+
+def site_sort_key(site_id):
+    """Sort key putting numeric site ids in numeric order (2 before 10), then the rest"""
+    if str(site_id).isdigit():
+        return (0, int(site_id), "")
+    return (1, 0, str(site_id))
+
+
+def site_lookup(gdf, uid_column="image_id"):
+    """Dict of site id -> attribute dict (first row per id), built in one pass"""
+    rows = gdf.drop(columns=gdf.geometry.name).drop_duplicates(uid_column)
+    return rows.set_index(uid_column).to_dict("index")
+
+
+class ImageCatalog:
+    """What has been extracted to a folder: site id, date, size and bounds per tif
+
+    Each file is parsed and opened once; the results are kept in
+    <folder>/catalog.json and only new or changed files are read on later
+    scans. The downloader adds files as it extracts them, along with the
+    OneAtlas image id, so `find(site_id, image_id)` can tell whether an image
+    is already on disk. Safe to share between threads.
+    """
+
+    def __init__(self, folder, extensions=(".tif", ".tiff"), index_name="catalog.json"):
+        self.folder = Path(folder)
+        self.extensions = extensions
+        self.index_path = self.folder / index_name
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = {}
+        # site id -> entries newest first, rebuilt after any change
+        self._sites = None
+        if self.index_path.exists():
+            with open(self.index_path) as file:
+                for entry in json.load(file):
+                    entry["acquired"] = entry["acquired"] and datetime.fromisoformat(
+                        entry["acquired"]
+                    )
+                    entry["path"] = str(self.folder / entry["name"])
+                    entry["bounds"] = tuple(entry["bounds"])
+                    self._entries[entry["name"]] = entry
+        self.scan()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
+
+    def _read(self, path, stat, image_id=None):
+        # Only needed for new or changed files, so reading an index stays cheap
+        import rasterio
+
+        site_id, acquired = parse_image_name(path)
+        with rasterio.open(path) as src:
+            bounds = tuple(src.bounds)
+            crs = src.crs.to_string() if src.crs else None
+        return {
+            "name": path.name,
+            "path": str(path),
+            "site_id": site_id,
+            "acquired": acquired,
+            "image_id": image_id,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "bounds": bounds,
+            "crs": crs,
+        }
+
+    def scan(self):
+        """Index new or changed files and forget deleted ones"""
+        with self._lock:
+            seen = set()
+            changed = False
+            for path in self.folder.iterdir():
+                if path.suffix.lower() not in self.extensions:
+                    continue
+                stat = path.stat()
+                seen.add(path.name)
+                entry = self._entries.get(path.name)
+                if entry and (entry["size"], entry["mtime"]) == (
+                    stat.st_size,
+                    stat.st_mtime,
+                ):
+                    continue
+                image_id = entry["image_id"] if entry else None
+                self._entries[path.name] = self._read(path, stat, image_id)
+                changed = True
+            for name in set(self._entries) - seen:
+                del self._entries[name]
+                changed = True
+            if changed:
+                self._save()
+
+    def add(self, path, image_id=None):
+        """Index a newly written file, recording the image id it came from"""
+        path = Path(path)
+        with self._lock:
+            entry = self._read(path, path.stat(), image_id)
+            self._entries[path.name] = entry
+            self._save()
+        return entry
+
+    def remove(self, path):
+        with self._lock:
+            if self._entries.pop(Path(path).name, None) is not None:
+                self._save()
+
+    def _save(self):
+        self._sites = None
+        entries = [
+            dict(entry, acquired=entry["acquired"] and entry["acquired"].isoformat())
+            for entry in self._entries.values()
+        ]
+        part_path = self.index_path.with_name(self.index_path.name + ".part")
+        with open(part_path, "w") as file:
+            json.dump(entries, file)
+        os.replace(part_path, self.index_path)
+
+    def site_ids(self):
+        return sorted(
+            {entry["site_id"] for entry in self._entries.values()}, key=site_sort_key
+        )
+
+    def by_site(self, site_id=None):
+        """Entries for one site newest first, or a dict of them for every site"""
+        with self._lock:
+            if self._sites is None:
+                self._sites = {}
+                for entry in self._entries.values():
+                    self._sites.setdefault(entry["site_id"], []).append(entry)
+                for entries in self._sites.values():
+                    entries.sort(
+                        key=lambda e: e["acquired"] or datetime.min, reverse=True
+                    )
+            sites = self._sites
+        if site_id is None:
+            return sites
+        return sites.get(site_id, [])
+
+    def find(self, site_id, image_id=None):
+        """Path of a tif already held for the site (from image_id if given), or None"""
+        for entry in self.by_site(site_id):
+            if image_id is None or entry["image_id"] == image_id:
+                if os.path.exists(entry["path"]):
+                    return entry["path"]
+        return None
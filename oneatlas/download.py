@@ -0,0 +1,282 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+BUFFER_SIZE = 1024 * 1024
+MIN_SEGMENT_SIZE = 32 * 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class DownloadError(Exception):
+    """A download could not be completed or failed verification"""
+
+
+def probe_size(request, url, headers=None, params=None):
+    """Total size of url if the server honours ranges, otherwise None"""
+    headers = dict(headers or {}, Range="bytes=0-0")
+    with request("GET", url, headers=headers, params=params, stream=True) as r:
+        if r.status_code != 206:
+            return None
+        match = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+    if match is None or match.group(3) == "*":
+        return None
+    return int(match.group(3))
+
+
+class RangedDownload:
+    """Download a URL to a file, resuming and optionally splitting with Range requests
+
+    Data is written to `<path>.part` and only renamed to `path` once complete
+    and verified, so a partial file is never mistaken for a finished one. If
+    the connection drops, the download carries on from the last byte written
+    (with fresh headers, so an expired token is renewed). When the server
+    supports ranges and the file is large enough it is fetched as `segments`
+    byte ranges in parallel; their progress is kept in `<path>.part.json` so a
+    rerun resumes those too.
+
+    request is a callable like OneAtlasClient._request and headers a callable
+    returning the headers to send, called again on every (re)connection.
+    checksum is an optional "algorithm:hexdigest" string, e.g. "md5:9e10...".
+    """
+
+    def __init__(
+        self,
+        request,
+        url,
+        path,
+        headers=dict,
+        params=None,
+        segments=1,
+        buffer_size=BUFFER_SIZE,
+        min_segment_size=MIN_SEGMENT_SIZE,
+        expected_size=None,
+        checksum=None,
+        max_resumes=5,
+    ):
+        self.request = request
+        self.url = url
+        self.path = Path(path)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self.state_path = self.path.with_name(self.path.name + ".part.json")
+        self.headers = headers
+        self.params = params
+        self.segments = max(1, segments)
+        self.buffer_size = buffer_size
+        self.min_segment_size = min_segment_size
+        self.expected_size = expected_size
+        self.checksum = checksum
+        self.max_resumes = max_resumes
+        self.bytes_downloaded = 0
+        self.resumes = 0
+        self._lock = threading.Lock()
+
+    def run(self):
+        # A part file without segment state came from a single stream; keep streaming
+        streamed_part = self.part_path.exists() and not self.state_path.exists()
+        total = None
+        if self.segments > 1 and not streamed_part:
+            total = self._probe_size()
+        if total is not None and total >= 2 * self.min_segment_size:
+            self._download_segments(total)
+        else:
+            if self.state_path.exists():
+                # Segment layout can't be resumed as a single stream, start over
+                self.part_path.unlink(missing_ok=True)
+                self.state_path.unlink()
+            self._download_stream()
+        self._verify()
+        os.replace(self.part_path, self.path)
+        self.state_path.unlink(missing_ok=True)
+        return self.path
+
+    def _get(self, start=None, end=None):
+        headers = dict(self.headers())
+        if start is not None:
+            headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+        response = self.request(
+            "GET", self.url, headers=headers, params=self.params, stream=True
+        )
+        if response.status_code == 416:
+            return response
+        response.raise_for_status()
+        return response
+
+    def _probe_size(self):
+        return probe_size(self.request, self.url, self.headers(), self.params)
+
+    def _copy(self, response, f):
+        """Write the response body to f, returning the number of bytes written"""
+        written = 0
+        for chunk in response.iter_content(chunk_size=self.buffer_size):
+            f.write(chunk)
+            written += len(chunk)
+            with self._lock:
+                self.bytes_downloaded += len(chunk)
+        return written
+
+    def _download_stream(self):
+        offset = self.part_path.stat().st_size if self.part_path.exists() else 0
+        while True:
+            try:
+                with self._get(offset if offset else None) as r:
+                    if r.status_code == 416:
+                        # Nothing left to fetch; the part file is already complete
+                        return
+                    if r.status_code != 206:
+                        offset = 0
+                    with open(self.part_path, "ab" if offset else "wb") as f:
+                        offset += self._copy(r, f)
+                return
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                self._resumed()
+                offset = self.part_path.stat().st_size
+
+    def _download_segments(self, total):
+        segments = min(self.segments, total // self.min_segment_size)
+        state = self._load_state(total, segments)
+        if state is None:
+            step = -(-total // segments)
+            state = {
+                "size": total,
+                "segments": [
+                    [start, min(start + step, total) - 1, 0]
+                    for start in range(0, total, step)
+                ],
+            }
+            with open(self.part_path, "wb") as f:
+                f.truncate(total)
+        self._state = state
+        with ThreadPoolExecutor(max_workers=len(state["segments"])) as executor:
+            for future in [
+                executor.submit(self._download_segment, segment)
+                for segment in state["segments"]
+            ]:
+                future.result()
+
+    def _download_segment(self, segment):
+        start, end, _ = segment
+        with open(self.part_path, "r+b") as f:
+            while segment[2] < end - start + 1:
+                try:
+                    with self._get(start + segment[2], end) as r:
+                        if r.status_code != 206:
+                            raise DownloadError(f"{self.url} stopped honouring ranges")
+                        f.seek(start + segment[2])
+                        for chunk in r.iter_content(chunk_size=self.buffer_size):
+                            chunk = chunk[: end - start + 1 - segment[2]]
+                            f.write(chunk)
+                            with self._lock:
+                                segment[2] += len(chunk)
+                                self.bytes_downloaded += len(chunk)
+                    f.flush()
+                    self._save_state()
+                except (
+                    requests.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                ):
+                    f.flush()
+                    self._save_state()
+                    self._resumed()
+
+    def _resumed(self):
+        with self._lock:
+            self.resumes += 1
+            if self.resumes > self.max_resumes:
+                raise DownloadError(
+                    f"{self.url} failed after {self.max_resumes} resumed attempts"
+                )
+
+    def _load_state(self, total, segments):
+        if not (self.state_path.exists() and self.part_path.exists()):
+            return None
+        try:
+            state = json.loads(self.state_path.read_text())
+        except ValueError:
+            return None
+        if state.get("size") != total or len(state["segments"]) != segments:
+            return None
+        return state
+
+    def _save_state(self):
+        with self._lock:
+            tmp_path = self.state_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._state))
+            os.replace(tmp_path, self.state_path)
+
+    def _verify(self):
+        size = self.part_path.stat().st_size
+        if self.expected_size is not None and size != self.expected_size:
+            raise DownloadError(
+                f"{self.url} is {size} bytes, expected {self.expected_size}"
+            )
+        if self.checksum:
+            algorithm, expected = self.checksum.split(":", 1)
+            digest = hashlib.new(algorithm)
+            with open(self.part_path, "rb") as f:
+                for block in iter(lambda: f.read(self.buffer_size), b""):
+                    digest.update(block)
+            if digest.hexdigest().lower() != expected.lower():
+                # A corrupt part file can't be resumed, start over next time
+                self.part_path.unlink()
+                self.state_path.unlink(missing_ok=True)
+                raise DownloadError(f"{self.url} failed {algorithm} verification")
+
+
+class RangeReader(io.RawIOBase):
+    """Read-only, seekable file over HTTP Range requests
+
+    Lets zipfile read a remote archive's central directory and stream a single
+    member without downloading the rest. Wrap it in io.BufferedReader so reads
+    are made in large ranges rather than zipfile's small ones.
+    """
+
+    def __init__(self, request, url, headers=dict, params=None):
+        self.request = request
+        self.url = url
+        self.headers = headers
+        self.params = params
+        self.position = 0
+        self.bytes_downloaded = 0
+        self.size = probe_size(request, url, headers(), params)
+        if self.size is None:
+            raise DownloadError(f"{url} does not support range requests")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer):
+        end = min(self.position + len(buffer), self.size) - 1
+        if end < self.position:
+            return 0
+        headers = dict(self.headers())
+        headers["Range"] = f"bytes={self.position}-{end}"
+        response = self.request("GET", self.url, headers=headers, params=self.params)
+        response.raise_for_status()
+        data = response.content
+        buffer[: len(data)] = data
+        self.position += len(data)
+        self.bytes_downloaded += len(data)
+        return len(data)
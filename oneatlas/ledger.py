@@ -0,0 +1,120 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class JobLedger:
+    """Local SQLite record of how far each site and order got in a batch run
+
+    Every stage is committed as soon as it happens, so after a crash a rerun
+    can skip finished work and, crucially, knows which orders were already
+    placed (and paid for). Orders are keyed by their customerRef; "ordering"
+    is recorded just before an order is sent, so only those orders can have
+    been placed without the ledger knowing.
+    """
+
+    STAGES = (
+        "searched",
+        "priced",
+        "ordering",
+        "ordered",
+        "delivered",
+        "downloaded",
+        "extracted",
+    )
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS sites (
+                    site_id TEXT PRIMARY KEY,
+                    image_ids TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS orders (
+                    customer_ref TEXT PRIMARY KEY,
+                    site_id TEXT,
+                    image_id TEXT,
+                    stage TEXT NOT NULL,
+                    order_id TEXT,
+                    price REAL,
+                    path TEXT,
+                    updated_at TEXT NOT NULL
+                )""")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def site_images(self, site_id):
+        """Image ids chosen for a site on an earlier run, or None if not searched yet"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT image_ids FROM sites WHERE site_id = ?", (str(site_id),)
+            ).fetchone()
+        return json.loads(row["image_ids"]) if row else None
+
+    def record_search(self, site_id, image_ids):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sites VALUES (?, ?, ?)",
+                (str(site_id), json.dumps(image_ids), datetime.now().isoformat()),
+            )
+
+    def get(self, customer_ref):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM orders WHERE customer_ref = ?", (customer_ref,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def reached(self, customer_ref, stage):
+        """True if the order has got to `stage` or beyond"""
+        job = self.get(customer_ref)
+        if job is None:
+            return False
+        return self.STAGES.index(job["stage"]) >= self.STAGES.index(stage)
+
+    def record(self, customer_ref, stage, **fields):
+        """Move an order to `stage`, updating any of site_id, image_id, order_id, price, path"""
+        if stage not in self.STAGES:
+            raise ValueError(f"unknown stage {stage}, expected one of {self.STAGES}")
+        unknown = set(fields) - {"site_id", "image_id", "order_id", "price", "path"}
+        if unknown:
+            raise ValueError(f"unknown fields {', '.join(sorted(unknown))}")
+        # None stays NULL (e.g. a delivery with no tif extracted has no path)
+        fields = {
+            k: str(v) if k != "price" and v is not None else v
+            for k, v in fields.items()
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO orders (customer_ref, stage, updated_at) VALUES (?, ?, ?)",
+                (customer_ref, stage, datetime.now().isoformat()),
+            )
+            assignments = ", ".join(
+                f"{k} = ?" for k in ["stage", "updated_at", *fields]
+            )
+            self._conn.execute(
+                f"UPDATE orders SET {assignments} WHERE customer_ref = ?",
+                (stage, datetime.now().isoformat(), *fields.values(), customer_ref),
+            )
+
+    def summary(self):
+        """Number of orders at each stage"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) AS n FROM orders GROUP BY stage"
+            ).fetchall()
+        counts = {row["stage"]: row["n"] for row in rows}
+        return {stage: counts.get(stage, 0) for stage in self.STAGES}
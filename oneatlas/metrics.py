@@ -0,0 +1,139 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class Metrics:
+    """Timings of API requests and pipeline stages over a run
+
+    Pass one to OneAtlasClient(metrics=...) and every request is recorded
+    per endpoint with its latency, status, attempts and bytes; wrap pipeline
+    steps in `with metrics.stage("download", site=...)` to time them too.
+    With path set each event is also appended there as a JSON line as it
+    happens, so a long run can be inspected while it is still going.
+    summary() gives counts, p50/p95 and throughput per kind and name.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = open(path, "a") if path else None
+        self._lock = threading.Lock()
+        # (kind, name) -> {"seconds": [...], "errors": n, "bytes": n}
+        self._series = {}
+        self.started = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, kind, name, seconds, error=None, nbytes=None, **fields):
+        event = {
+            "time": datetime.now().isoformat(),
+            "kind": kind,
+            "name": name,
+            "seconds": round(seconds, 6),
+            **fields,
+        }
+        if nbytes is not None:
+            event["bytes"] = nbytes
+        if error is not None:
+            event["error"] = error
+        with self._lock:
+            series = self._series.setdefault(
+                (kind, name), {"seconds": [], "errors": 0, "bytes": 0}
+            )
+            series["seconds"].append(seconds)
+            series["errors"] += error is not None
+            series["bytes"] += nbytes or 0
+            if self._file is not None:
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._file.flush()
+
+    def on_request(self, event):
+        """Request hook for OneAtlasClient, see OneAtlasClient._request"""
+        event = dict(event)
+        self.record(
+            "request",
+            event.pop("endpoint"),
+            event.pop("seconds"),
+            nbytes=event.pop("bytes", None),
+            **event,
+        )
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time the enclosed block as one occurrence of a pipeline stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.record(
+                "stage", name, time.perf_counter() - start, error=repr(e), **fields
+            )
+            raise
+        self.record("stage", name, time.perf_counter() - start, **fields)
+
+    def summary(self):
+        """One dict per (kind, name): count, errors, p50, p95, total seconds, MB/s"""
+        with self._lock:
+            series = {
+                key: dict(value, seconds=sorted(value["seconds"]))
+                for key, value in self._series.items()
+            }
+        rows = []
+        for (kind, name), value in sorted(series.items()):
+            seconds = value["seconds"]
+            total = sum(seconds)
+            rows.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "count": len(seconds),
+                    "errors": value["errors"],
+                    "p50": percentile(seconds, 50),
+                    "p95": percentile(seconds, 95),
+                    "total_seconds": total,
+                    "mb": value["bytes"] / 1024 / 1024,
+                    "mb_per_s": (
+                        value["bytes"] / 1024 / 1024 / total
+                        if value["bytes"] and total
+                        else None
+                    ),
+                }
+            )
+        return rows
+
+    def format_summary(self):
+        """summary() as a fixed-width table"""
+        header = (
+            f"{'kind':8} {'name':52} {'count':>7} {'errors':>6} "
+            f"{'p50 s':>8} {'p95 s':>8} {'total s':>9} {'MB':>9} {'MB/s':>7}"
+        )
+        lines = [header, "-" * len(header)]
+        for row in self.summary():
+            mb_per_s = f"{row['mb_per_s']:7.1f}" if row["mb_per_s"] else f"{'':7}"
+            lines.append(
+                f"{row['kind']:8} {row['name'][:52]:52} {row['count']:7d} "
+                f"{row['errors']:6d} {row['p50']:8.3f} {row['p95']:8.3f} "
+                f"{row['total_seconds']:9.1f} {row['mb']:9.1f} {mb_per_s}"
+            )
+        elapsed = time.perf_counter() - self.started
+        lines.append(f"wall time {elapsed:.1f}s")
+        return "\n".join(lines)
@@ -1,17 +1,24 @@
-from datetime import datetime, timedelta
-
 import requests
+from requests.adapters import HTTPAdapter
+
+from .download import BUFFER_SIZE, RangedDownload, RangeReader
+from .pagination import paginate
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .tokens import TokenManager
+
+from functools import partial
+from io import BufferedReader
+from urllib.parse import urlsplit
+import os
 import time
 
-from io import BytesIO
-import matplotlib.pyplot as plt
-from PIL import Image
-
 
 class Auth:
     def create_api_key(self, description=None):
-        response = requests.post(
-            url=f"{OneAtlasClient.AUTH_URL}/api/v1/apikeys",
+        response = self._request(
+            "POST",
+            url=f"{self.AUTH_URL}/api/v1/apikeys",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_AAA),
             json={"description": description},
         )
@@ -19,15 +26,17 @@ class Auth:
         return response.json()
 
     def delete_api_keys(self):
-        response = requests.delete(
-            url=f"{OneAtlasClient.AUTH_URL}/api/v1/apikeys",
+        response = self._request(
+            "DELETE",
+            url=f"{self.AUTH_URL}/api/v1/apikeys",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_AAA),
         )
         response.raise_for_status()
 
     def list_api_keys(self):
-        response = requests.get(
-            url=f"{OneAtlasClient.AUTH_URL}/api/v1/apikeys",
+        response = self._request(
+            "GET",
+            url=f"{self.AUTH_URL}/api/v1/apikeys",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_AAA),
         )
         response.raise_for_status()
@@ -37,76 +46,97 @@ class Auth:
 class Data:
 
     def create_order(self, body):
-        response = requests.post(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/orders",
+        response = self._request(
+            "POST",
+            url=f"{self.DATA_URL}/api/v1/orders",
             json=body,
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
-    def download_order_to_file(self, order, download_path):
+    @staticmethod
+    def get_download_link(order):
         try:
-            download_link = order["deliveries"][0]["_links"]["download"]["href"]
+            return order["deliveries"][0]["_links"]["download"]["href"]
         except KeyError:
             raise ValueError(
                 'Invalid order provided; the entire order is required, { "_links": {...}, "id": ...}'
             )
-        self.download_url_to_file(download_link, download_path)
+
+    def download_order_to_file(self, order, download_path, **kwargs):
+        download_link = self.get_download_link(order)
+        self.download_url_to_file(download_link, download_path, **kwargs)
         print(f"Downloaded to {download_path}")
 
     def get_account_information(self):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/me",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/me",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
     def get_contract(self, contract_id):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/contracts/{contract_id}",
+        return self._cached(
+            "contract", contract_id, lambda: self._get_contract(contract_id)
+        )
+
+    def _get_contract(self, contract_id):
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/contracts/{contract_id}",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
     def get_contract_subscription(self, contract_id, subscription_id):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/contracts/{contract_id}/subscriptions/{subscription_id}",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/contracts/{contract_id}/subscriptions/{subscription_id}",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
     def get_contract_payment(self, contract_id, payment_id):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/contracts/{contract_id}/payments/{payment_id}",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/contracts/{contract_id}/payments/{payment_id}",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
     def get_order(self, order_id):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/orders/{order_id}",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/orders/{order_id}",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
     def get_price(self, body):
-        response = requests.post(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/prices",
+        return self._cached("price", body, lambda: self._get_price(body))
+
+    def _get_price(self, body):
+        response = self._request(
+            "POST",
+            url=f"{self.DATA_URL}/api/v1/prices",
             json=body,
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
+            idempotent=True,
         )
         response.raise_for_status()
         return response.json()
 
     def list_analytics(self, page=1, items_per_page=10):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/analytics",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/analytics",
             params={
                 "page": page,
                 "itemsPerPage": items_per_page,
@@ -117,8 +147,9 @@ class Data:
         return response.json()
 
     def list_contracts(self, page=1, items_per_page=10):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/contracts",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/contracts",
             params={
                 "page": page,
                 "itemsPerPage": items_per_page,
@@ -129,8 +160,9 @@ class Data:
         return response.json()
 
     def list_contract_payments(self, contract_id, page=1, items_per_page=10):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/contracts/{contract_id}/payments",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/contracts/{contract_id}/payments",
             params={
                 "page": page,
                 "itemsPerPage": items_per_page,
@@ -143,8 +175,9 @@ class Data:
     def list_contract_subscriptions(
         self, contract_id, page=1, items_per_page=10, type=None
     ):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/contracts/{contract_id}/subscriptions",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/contracts/{contract_id}/subscriptions",
             params={"page": page, "itemsPerPage": items_per_page, "type": type},
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
@@ -154,31 +187,25 @@ class Data:
     def list_orders(
         self, status=None, kind=None, customerRef=None, page=1, items_per_page=10
     ):
-        attempts = 0
-        while attempts < 5:
-            try:
-                response = requests.get(
-                    url=f"{OneAtlasClient.DATA_URL}/api/v1/orders",
-                    params={
-                        "status": status,
-                        "kind": kind,
-                        "customerRef": customerRef,
-                        "page": page,
-                        "itemsPerPage": items_per_page,
-                    },
-                    headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
-                )
-                response.raise_for_status()
-                return response.json()  # Success, return the JSON response
-            except requests.HTTPError:
-                attempts += 1  # Increment the attempt counter
-                if attempts == 5:
-                    raise  # Re-raise the last exception after max attempts
-                time.sleep(5)
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/orders",
+            params={
+                "status": status,
+                "kind": kind,
+                "customerRef": customerRef,
+                "page": page,
+                "itemsPerPage": items_per_page,
+            },
+            headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
+        )
+        response.raise_for_status()
+        return response.json()
 
     def list_subscription_payments(self, subscription_id, page=1, items_per_page=10):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/subscriptions/{subscription_id}/payments",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/subscriptions/{subscription_id}/payments",
             params={
                 "page": page,
                 "itemsPerPage": items_per_page,
@@ -188,17 +215,102 @@ class Data:
         response.raise_for_status()
         return response.json()
 
+    def iter_analytics(self, items_per_page=100, prefetch=False, until=None):
+        """Yield analytics across all pages, see paginate"""
+        return paginate(
+            lambda page, n: self.list_analytics(page=page, items_per_page=n),
+            items_per_page,
+            prefetch,
+            until,
+        )
+
+    def iter_contracts(self, items_per_page=100, prefetch=False, until=None):
+        """Yield contracts across all pages, see paginate"""
+        return paginate(
+            lambda page, n: self.list_contracts(page=page, items_per_page=n),
+            items_per_page,
+            prefetch,
+            until,
+        )
+
+    def iter_contract_payments(
+        self, contract_id, items_per_page=100, prefetch=False, until=None
+    ):
+        """Yield a contract's payments across all pages, see paginate"""
+        return paginate(
+            lambda page, n: self.list_contract_payments(
+                contract_id, page=page, items_per_page=n
+            ),
+            items_per_page,
+            prefetch,
+            until,
+        )
+
+    def iter_contract_subscriptions(
+        self, contract_id, type=None, items_per_page=100, prefetch=False, until=None
+    ):
+        """Yield a contract's subscriptions across all pages, see paginate"""
+        return paginate(
+            lambda page, n: self.list_contract_subscriptions(
+                contract_id, page=page, items_per_page=n, type=type
+            ),
+            items_per_page,
+            prefetch,
+            until,
+        )
+
+    def iter_orders(
+        self,
+        status=None,
+        kind=None,
+        customerRef=None,
+        items_per_page=100,
+        prefetch=False,
+        until=None,
+    ):
+        """Yield orders across all pages, see paginate
+
+        e.g. next(client.iter_orders(until=lambda o: o["customerRef"] == ref))
+        """
+        return paginate(
+            lambda page, n: self.list_orders(
+                status=status,
+                kind=kind,
+                customerRef=customerRef,
+                page=page,
+                items_per_page=n,
+            ),
+            items_per_page,
+            prefetch,
+            until,
+        )
+
+    def iter_subscription_payments(
+        self, subscription_id, items_per_page=100, prefetch=False, until=None
+    ):
+        """Yield a subscription's payments across all pages, see paginate"""
+        return paginate(
+            lambda page, n: self.list_subscription_payments(
+                subscription_id, page=page, items_per_page=n
+            ),
+            items_per_page,
+            prefetch,
+            until,
+        )
+
     def get_user_roles(self):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/me/services",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/me/services",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
         return response.json()
 
     def revoke_subscription(self, subscription_id):
-        response = requests.get(
-            url=f"{OneAtlasClient.DATA_URL}/api/v1/{subscription_id}/revoke",
+        response = self._request(
+            "GET",
+            url=f"{self.DATA_URL}/api/v1/{subscription_id}/revoke",
             headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
         )
         response.raise_for_status()
@@ -208,23 +320,18 @@ class Data:
 class Search:
 
     def search(self, body):
-        attempts = 0
-        while attempts < 5:
-            try:
-                response = requests.post(
-                    url=f"{OneAtlasClient.SEARCH_URL}/api/v2/opensearch",
-                    json=body,
-                    headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
-                )
-                response.raise_for_status()
-                return (
-                    response.json()
-                )  # If request is successful, return the JSON response
-            except requests.HTTPError:
-                attempts += 1  # Increment attempts counter
-                if attempts == 5:
-                    raise  # Re-raise the last exception after max attempts are reached
-                time.sleep(5)  # Wait for 5 seconds before retrying
+        return self._cached("search", body, lambda: self._search(body))
+
+    def _search(self, body):
+        response = self._request(
+            "POST",
+            url=f"{self.SEARCH_URL}/api/v2/opensearch",
+            json=body,
+            headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
+            idempotent=True,
+        )
+        response.raise_for_status()
+        return response.json()
 
     def download_quicklook_to_file(self, scene, download_path):
         try:
@@ -253,80 +360,304 @@ class OneAtlasClient(Auth, Data, Search):
     DATA_URL = "https://data.api.oneatlas.airbus.com"
     SEARCH_URL = "https://search.foundation.api.oneatlas.airbus.com"
 
-    def __init__(self, api_key=None):
-        self._access_tokens = {}
+    def __init__(
+        self,
+        api_key=None,
+        pool_connections=4,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        timeout=(10, 60),
+        retry=None,
+        token_cache=None,
+        token_refresh_margin=60,
+        background_token_refresh=False,
+        cache=None,
+        rate_limiter=None,
+        metrics=None,
+    ):
         self.api_key = api_key
         self.result_data = []
         self.result_index = 0
         self.current_image = ""
+        # Optional QuicklookManager used by show_result
+        self.quicklooks = None
+        self.timeout = timeout
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.cache = cache
+        # Optional RateLimiter shared by every thread using this client
+        self.rate_limiter = rate_limiter
+        # Callables given a dict describing each finished request
+        self.request_hooks = []
+        self.metrics = metrics
+        if metrics is not None:
+            self.request_hooks.append(metrics.on_request)
+        self.tokens = TokenManager(
+            self._authenticate,
+            refresh_margin=token_refresh_margin,
+            cache_path=token_cache,
+            cache_key=api_key or "",
+            background=background_token_refresh,
+        )
+        self.session = self._create_session(
+            pool_connections, pool_maxsize, pool_block, keep_alive
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the pooled connections held by the client session"""
+        self.tokens.stop()
+        self.session.close()
+
+    @staticmethod
+    def _create_session(pool_connections, pool_maxsize, pool_block, keep_alive):
+        """Create a session with a pool of reusable connections per host
+
+        pool_connections is the number of hosts to keep pools for (auth, data,
+        search and the download host) and pool_maxsize the connections kept
+        open per host, which should be at least the number of worker threads.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _request(self, method, url, idempotent=None, family=None, **kwargs):
+        """Send a request through the shared session, retrying per self.retry
+
+        idempotent=True marks POSTs that are safe to repeat (search, prices).
+        Every attempt first waits on the rate limiter for the endpoint family,
+        which is worked out from the url unless given. A 401 for one of our
+        tokens (revoked, or stale from the shared cache) invalidates it and the
+        request is sent once more with a new one.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        family = family or self._endpoint_family(url)
+        attempts = 0
+
+        def send():
+            nonlocal attempts
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(family)
+            attempts += 1
+            return self.session.request(method, url, **kwargs)
+
+        def call():
+            response = self.retry.call(send, method, idempotent=idempotent)
+            if response.status_code == 401:
+                client_id = self.tokens.reject(kwargs.get("headers"))
+                if client_id is not None:
+                    # Refused before processing, so safe to send again even if not idempotent
+                    response.close()
+                    kwargs["headers"] = dict(
+                        kwargs["headers"], **self.tokens.headers(client_id)
+                    )
+                    response = self.retry.call(send, method, idempotent=idempotent)
+            return response
+
+        if not self.request_hooks:
+            return call()
+        start = time.perf_counter()
+        event = {
+            "endpoint": f"{method} {self._endpoint_name(family, url)}",
+            "method": method,
+        }
+        try:
+            response = call()
+        except Exception as e:
+            event["error"] = repr(e)
+            raise
+        else:
+            event["status"] = response.status_code
+            if not kwargs.get("stream"):
+                event["bytes"] = len(response.content)
+        finally:
+            event["seconds"] = time.perf_counter() - start
+            event["attempts"] = attempts
+            self._emit(event)
+        return response
+
+    def _emit(self, event):
+        for hook in self.request_hooks:
+            hook(event)
+
+    def _endpoint_name(self, family, url):
+        """family plus the url path with ids replaced, e.g. data /api/v1/orders/{id}"""
+        path = urlsplit(url).path
+        for base_url in (self.AUTH_URL, self.SEARCH_URL, self.DATA_URL):
+            base_path = urlsplit(base_url).path
+            if url.startswith(base_url) and base_path:
+                path = path[len(base_path) :]
+                break
+        if family == "download":
+            return "download"
+        return f"{family} " + "/".join(
+            (
+                "{id}"
+                if any(c.isdigit() for c in part) and part not in ("v1", "v2")
+                else part
+            )
+            for part in path.split("/")
+        )
+
+    def _endpoint_family(self, url):
+        """auth, search or data by API host; anything else is a download"""
+        for family, base_url in (
+            ("auth", self.AUTH_URL),
+            ("search", self.SEARCH_URL),
+            ("data", self.DATA_URL),
+        ):
+            if url.startswith(base_url):
+                return family
+        return "download"
+
+    @property
+    def rate_limit_stats(self):
+        """Requests and time spent waiting per endpoint family, if rate limited"""
+        return self.rate_limiter.stats if self.rate_limiter is not None else {}
+
+    def _cached(self, endpoint, body, fetch):
+        """fetch() through the optional response cache for read-only endpoints"""
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch(endpoint, body, fetch)
+
+    @property
+    def retry_stats(self):
+        """Counts of retries and total seconds spent backing off"""
+        return self.retry.stats
 
     def _authenticate(self, client_id=None):
-        response = requests.post(
-            url=f"{OneAtlasClient.AUTH_URL}/auth/realms/IDP/protocol/openid-connect/token",
+        response = self._request(
+            "POST",
+            url=f"{self.AUTH_URL}/auth/realms/IDP/protocol/openid-connect/token",
             data={
                 "apikey": self.api_key,
                 "client_id": client_id,
                 "grant_type": "api_key",
             },
+            idempotent=True,
         )
         response.raise_for_status()
-        access_token = response.json()
-        access_token["expiration"] = datetime.now() + timedelta(
-            seconds=access_token["expires_in"] - 10
-        )
-        self._access_tokens[client_id] = access_token
+        return response.json()
 
     def _access_token(self, client_id=None):
-        if client_id not in self._access_tokens:
-            self._authenticate(client_id)
-        elif self._access_tokens[client_id]["expiration"] < datetime.now():
-            self._authenticate(client_id)
-
-        return {
-            "Authorization": f"Bearer " + self._access_tokens[client_id]["access_token"]
-        }
-
-    def download_url_to_file(self, url, path, params=None):
-        with requests.get(
+        return self.tokens.headers(client_id)
+
+    @property
+    def auth_stats(self):
+        """Counts of authentication round trips, cache hits and background refreshes"""
+        return self.tokens.stats
+
+    def download_url_to_file(
+        self,
+        url,
+        path,
+        params=None,
+        segments=1,
+        buffer_size=BUFFER_SIZE,
+        expected_size=None,
+        checksum=None,
+    ):
+        """Download url to path, resuming from a partial `<path>.part` if there is one
+
+        With segments > 1 large files are fetched as parallel byte ranges. If
+        given, the final size and "algorithm:hexdigest" checksum are verified
+        before the file is moved into place. See RangedDownload.
+        """
+        start = time.perf_counter()
+        result = RangedDownload(
+            partial(self._request, family="download"),
             url,
-            headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
+            path,
+            headers=lambda: self._access_token(self.CLIENT_ID_IDP),
             params=params,
-            stream=True,
-        ) as r:
-            r.raise_for_status()
-            with open(path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            segments=segments,
+            buffer_size=buffer_size,
+            expected_size=expected_size,
+            checksum=checksum,
+        ).run()
+        if self.request_hooks:
+            # The ranged requests only time their headers; this is the transfer
+            self._emit(
+                {
+                    "endpoint": "GET download transfer",
+                    "method": "GET",
+                    "seconds": time.perf_counter() - start,
+                    "bytes": os.path.getsize(path),
+                }
+            )
+        return result
+
+    def open_url(self, url, params=None, buffer_size=BUFFER_SIZE):
+        """Seekable file object reading url on demand with Range requests
+
+        e.g. zipfile.ZipFile(client.open_url(link)) to pull one member of a
+        delivery without downloading the whole archive.
+        """
+        return BufferedReader(
+            RangeReader(
+                partial(self._request, family="download"),
+                url,
+                headers=lambda: self._access_token(self.CLIENT_ID_IDP),
+                params=params,
+            ),
+            buffer_size=buffer_size,
+        )
+
+    def plot_image_from_url(self, url, params=None, max_size=None):
+        """Show the image at url, full size or reduced to max_size pixels a side"""
+        # Plotting is loaded on first use so API-only callers never import matplotlib
+        from .plotting import open_image, show_image
 
-    def plot_image_from_url(self, url, params=None):
-        with requests.get(
+        with self._request(
+            "GET",
             url,
-            headers=self._access_token(OneAtlasClient.CLIENT_ID_IDP),
+            headers=self._access_token(self.CLIENT_ID_IDP),
             params=params,
             stream=True,
         ) as r:
             r.raise_for_status()
-            # Read the image from the response's bytes directly in memory
-            image_bytes = BytesIO(r.content)
-            # Open the image using PIL
-            img = Image.open(image_bytes)
-            # Plot the image
-            plt.imshow(img)
-            plt.axis("off")  # Optional: Turn off the axis labels
-            plt.show()
-
-    def extract_results(self, results):
-        self.result_data = [
+            # PIL copies a non-seekable stream into memory before decoding, so
+            # the whole body is held as with r.content; max_size only makes
+            # the decoded array smaller
+            r.raw.decode_content = True
+            img = open_image(r.raw, max_size=max_size)
+        # Plot the image
+        show_image(img)
+
+    @staticmethod
+    def parse_results(results):
+        """Relevant values from search results, without touching client state"""
+        return [
             {
                 "image_id": f["properties"]["id"],
                 "quicklook_link": f["_links"]["quicklook"]["href"],
                 "acquisition_date": f["properties"]["acquisitionDate"],
                 "constellation": f["properties"]["constellation"],
                 "cloud_cover": f["properties"]["cloudCover"],
+                "incidence_angle": f["properties"].get("incidenceAngle"),
+                "geometry": f.get("geometry"),
             }
             for f in results["features"]
         ]
+
+    def extract_results(self, results):
+        self.result_data = self.parse_results(results)
         self.result_index = 0
+        return self.result_data
 
     def show_result(self):
         if not self.result_data:
@@ -342,25 +673,19 @@ class OneAtlasClient(Auth, Data, Search):
         print(f"Constellation: {item['constellation']}")
         print(f"Cloud Cover: {item['cloud_cover']}%")
         self.current_image = item["image_id"]
-        self.plot_image_from_url(item["quicklook_link"])
+        if self.quicklooks is not None:
+            following = self.result_data[self.result_index + 1 :]
+            self.quicklooks.show(item, following)
+        else:
+            self.plot_image_from_url(item["quicklook_link"])
 
         # Increment the index and wrap around if at the end of the list
         self.result_index = (self.result_index + 1) % len(self.result_data)
 
     def _make_request_with_retries(self, method, url, **kwargs):
-        attempts = 0
-        while attempts < 5:
-            try:
-                response = requests.request(method, url, **kwargs)
-                response.raise_for_status()
-                return (
-                    response.json()
-                )  # If request is successful, return the JSON response
-            except requests.HTTPError:
-                attempts += 1  # Increment attempts counter
-                if attempts == 5:
-                    raise  # Re-raise the last exception after max attempts are reached
-                time.sleep(5)  # Wait for 5 seconds before retrying
+        response = self._request(method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+import threading
+import time
+from concurrent.futures import Future
+
+DELIVERED_STATUS = "delivered"
+FAILED_STATUSES = frozenset({"failed", "rejected", "cancelled", "canceled"})
+
+
+class OrderFailed(Exception):
+    """Raised from a tracked order's future when it ends in a failed status"""
+
+    def __init__(self, order):
+        super().__init__(
+            f"order {order.get('customerRef', order.get('id'))} ended with status {order['status']}"
+        )
+        self.order = order
+
+
+class OrderTracker:
+    """Watch many outstanding orders with one paginated list_orders sweep per interval
+
+    track() returns a Future that resolves to the order once it is delivered,
+    or raises OrderFailed if it is failed/rejected/cancelled. The poll
+    interval starts at min_interval and grows by `backoff` after every sweep
+    that sees no change, back down to min_interval as soon as one does.
+    After max_failures sweeps in a row raise, every pending future gets the
+    last error, and an order not finished timeout seconds after it was
+    tracked gets a TimeoutError, so nothing waits forever on the tracker.
+
+        with OrderTracker(client) as tracker:
+            order = tracker.track("sg_quarry_1_1").result()
+    """
+
+    def __init__(
+        self,
+        client,
+        min_interval=10,
+        max_interval=120,
+        backoff=1.5,
+        items_per_page=100,
+        max_pages=10,
+        max_failures=5,
+        timeout=None,
+    ):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.items_per_page = items_per_page
+        self.max_pages = max_pages
+        self.max_failures = max_failures
+        self.timeout = timeout
+        self.interval = min_interval
+        self.sweeps = 0
+        self.api_calls = 0
+        self.failures = 0
+        self._pending = {}
+        self._deadlines = {}
+        self._statuses = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def track(self, customer_ref, callback=None, timeout=None):
+        """Future for the order with this customerRef, optionally calling callback(future)
+
+        timeout (default self.timeout) is how long the order may take, from now.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            future = self._pending.get(customer_ref)
+            if future is None:
+                future = self._pending[customer_ref] = Future()
+                if timeout is not None:
+                    self._deadlines[customer_ref] = (
+                        time.monotonic() + timeout,
+                        timeout,
+                    )
+                # Start polling at the fast rate again for the new order
+                self.interval = self.min_interval
+        if callback is not None:
+            future.add_done_callback(callback)
+        self._wake.set()
+        return future
+
+    @property
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.pending:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            try:
+                self.poll()
+                self.failures = 0
+            except Exception as e:
+                # The client's retry policy already absorbed transient errors,
+                # so keep tracking, but not forever if the API stays unusable
+                self.failures += 1
+                print(
+                    f"order status sweep failed ({self.failures}/{self.max_failures}): {e!r}"
+                )
+                if self.failures >= self.max_failures:
+                    self._fail_pending(e)
+                    self.failures = 0
+            self._expire()
+            swept = time.monotonic()
+            # Sleep until the next sweep is due. track() and stop() set _wake, so
+            # a new order is looked at min_interval after the last sweep rather
+            # than after the rest of a backed-off wait
+            while not self._stop.is_set():
+                remaining = swept + self.interval - time.monotonic()
+                with self._lock:
+                    if self._deadlines:
+                        remaining = min(
+                            remaining,
+                            min(self._deadlines.values())[0] - time.monotonic(),
+                        )
+                if remaining <= 0:
+                    break
+                self._wake.wait(remaining)
+                self._wake.clear()
+
+    def poll(self):
+        """Sweep order statuses once, resolving futures of finished orders"""
+        refs = set(self.pending)
+        found = {}
+        for page in range(1, self.max_pages + 1):
+            orders = self.client.list_orders(
+                page=page, items_per_page=self.items_per_page
+            )
+            self.api_calls += 1
+            items = orders.get("items", [])
+            for order in items:
+                ref = order.get("customerRef")
+                if ref in refs:
+                    found[ref] = order
+            if len(found) == len(refs) or len(items) < self.items_per_page:
+                break
+        # Orders older than the swept pages are looked up individually
+        for ref in refs - set(found):
+            orders = self.client.list_orders(customerRef=ref)
+            self.api_calls += 1
+            if orders.get("items"):
+                found[ref] = orders["items"][0]
+        self.sweeps += 1
+        self._update(found)
+        return found
+
+    def _update(self, found):
+        changed = False
+        for ref, order in found.items():
+            status = order.get("status")
+            if self._statuses.get(ref) != status:
+                self._statuses[ref] = status
+                changed = True
+            if status == DELIVERED_STATUS:
+                future = self._resolve(ref)
+                # The caller may have cancelled it; that mustn't stop the sweep
+                if not future.done():
+                    future.set_result(order)
+            elif status in FAILED_STATUSES:
+                future = self._resolve(ref)
+                if not future.done():
+                    future.set_exception(OrderFailed(order))
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def _resolve(self, ref):
+        with self._lock:
+            self._statuses.pop(ref, None)
+            self._deadlines.pop(ref, None)
+            return self._pending.pop(ref)
+
+    def _fail_pending(self, error):
+        for ref in self.pending:
+            future = self._resolve(ref)
+            if not future.done():
+                future.set_exception(error)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                (ref, timeout)
+                for ref, (at, timeout) in self._deadlines.items()
+                if at <= now
+            ]
+        for ref, timeout in expired:
+            future = self._resolve(ref)
+            if not future.done():
+                future.set_exception(
+                    TimeoutError(f"order {ref} not finished after {timeout:g}s")
+                )
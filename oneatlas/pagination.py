@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def paginate(fetch_page, items_per_page=100, prefetch=False, until=None, start_page=1):
+    """Yield items across pages of a list_* endpoint until the pages run out
+
+    fetch_page(page, items_per_page) returns one page of the response
+    ({"items": [...], "totalResults": ...}). Only one page is held at a time.
+    With prefetch=True the next page is requested in a background thread while
+    the caller works through the current one. If until(item) is true that item
+    is yielded and no further pages are requested.
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = start_page
+        response = fetch_page(page, items_per_page)
+        seen = 0
+        while True:
+            items = response.get("items", [])
+            seen += len(items)
+            total = response.get("totalResults")
+            last_page = len(items) < items_per_page or (
+                total is not None and seen >= total
+            )
+            next_page = None
+            if not last_page and executor is not None:
+                next_page = executor.submit(fetch_page, page + 1, items_per_page)
+            for item in items:
+                yield item
+                if until is not None and until(item):
+                    return
+            if last_page:
+                return
+            page += 1
+            if next_page is not None:
+                response = next_page.result()
+            else:
+                response = fetch_page(page, items_per_page)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,72 @@
+"""Planning of orders across sites before anything is ordered, requires shapely"""
+
+import hashlib
+
+import shapely
+from pyproj import Geod
+
+_GEOD = Geod(ellps="WGS84")
+
+
+def area_km2(geometry):
+    """Geodesic area of a lon/lat geometry in square kilometres"""
+    return abs(_GEOD.geometry_area_perimeter(geometry)[0]) / 1e6
+
+
+def consolidate_orders(selections, aois, max_area_km2=100):
+    """Merge sites that chose the same scene into as few orders as possible
+
+    selections is {site_id: [image_id, ...]} (e.g. from sift_images) and aois
+    {site_id: shapely geometry in EPSG:4326}. Sites sharing an image are
+    grouped under the bounding envelope of their AOIs, starting a new group
+    whenever adding a site would take the envelope over max_area_km2 (so merged
+    orders stay within pricing/size limits). Returns a list of dicts with
+    image_id, site_ids, aoi (the envelope) and site_aois; a group of one is
+    just that site's own order, with "index" its position in the selection.
+    """
+    sites_by_image = {}
+    index = {}
+    for site_id, image_ids in selections.items():
+        for i, image_id in enumerate(image_ids):
+            sites_by_image.setdefault(image_id, []).append(site_id)
+            index[(site_id, image_id)] = i
+    groups = []
+    for image_id, site_ids in sites_by_image.items():
+        # Sort west to east so greedy grouping keeps neighbours together
+        site_ids = sorted(site_ids, key=lambda s: shapely.centroid(aois[s]).x)
+        current = []
+        for site_id in site_ids:
+            candidate = current + [site_id]
+            envelope = shapely.envelope(shapely.union_all([aois[s] for s in candidate]))
+            if current and area_km2(envelope) > max_area_km2:
+                groups.append(_group(image_id, current, aois, index))
+                candidate = [site_id]
+            current = candidate
+        groups.append(_group(image_id, current, aois, index))
+    return groups
+
+
+def site_orders(selections, aois):
+    """One order per site and chosen image, in the same form as consolidate_orders"""
+    index = {}
+    for site_id, image_ids in selections.items():
+        for i, image_id in enumerate(image_ids):
+            index[(site_id, image_id)] = i
+    return [_group(image_id, [site_id], aois, index) for site_id, image_id in index]
+
+
+def _group(image_id, site_ids, aois, index):
+    site_ids = sorted(site_ids)
+    if len(site_ids) == 1:
+        aoi = aois[site_ids[0]]
+    else:
+        aoi = shapely.envelope(shapely.union_all([aois[s] for s in site_ids]))
+    key = hashlib.sha1(f"{image_id}:{site_ids}".encode()).hexdigest()[:10]
+    return {
+        "image_id": image_id,
+        "site_ids": site_ids,
+        "aoi": aoi,
+        "site_aois": {s: aois[s] for s in site_ids},
+        "index": index[(site_ids[0], image_id)],
+        "key": key,
+    }
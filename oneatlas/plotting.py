@@ -0,0 +1,44 @@
+"""Image decoding and plotting, requires matplotlib and pillow
+
+Only imported when something is actually shown, so code that just talks to
+the API (worker processes, servers) never pays for loading matplotlib.
+"""
+
+import math
+
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+
+
+def open_image(fp, max_size=None):
+    """Decode an image from a path or file object, reduced to max_size a side"""
+    with Image.open(fp) as img:
+        if max_size:
+            # JPEGs can be decoded straight at a reduced scale
+            img.draft("RGB", (max_size, max_size))
+            img.thumbnail((max_size, max_size))
+        return np.asarray(img)
+
+
+def show_image(image):
+    plt.imshow(image)
+    plt.axis("off")  # Optional: Turn off the axis labels
+    plt.show()
+
+
+def show_grid(images, titles=None, columns=4, size=4):
+    """One figure of many images side by side"""
+    rows = max(1, math.ceil(len(images) / columns))
+    fig, axes = plt.subplots(
+        rows, columns, figsize=(columns * size, rows * size), squeeze=False
+    )
+    for ax in axes.flat:
+        ax.set_axis_off()
+    for i, (ax, image) in enumerate(zip(axes.flat, images)):
+        ax.imshow(image)
+        if titles:
+            ax.set_title(titles[i], fontsize=9)
+    fig.tight_layout()
+    plt.show()
+    return fig
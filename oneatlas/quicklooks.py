@@ -0,0 +1,133 @@
+"""Prefetching, disk-cached quicklooks for reviewing search results"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class QuicklookManager:
+    """Fetch quicklooks in the background and keep them on disk and in memory
+
+    Quicklooks are saved under directory as <image_id>.jpg (least recently
+    used files are removed once max_disk_bytes is exceeded) and decoded once
+    into arrays no bigger than max_size pixels a side, of which the last
+    max_memory are kept in memory. prefetch() starts background downloads so
+    that flipping through results doesn't wait on the network.
+
+        client.quicklooks = QuicklookManager(client)
+        client.extract_results(results)
+        client.show_result()  # now prefetches the next few quicklooks
+    """
+
+    def __init__(
+        self,
+        client,
+        directory="quicklooks",
+        prefetch_count=4,
+        workers=4,
+        max_disk_bytes=500 * 1024 * 1024,
+        max_memory=64,
+        max_size=512,
+    ):
+        self.client = client
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefetch_count = prefetch_count
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory = max_memory
+        self.max_size = max_size
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+        self._arrays = OrderedDict()
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self.stats = {"downloads": 0, "disk_hits": 0, "memory_hits": 0}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _path(self, image):
+        return self.directory / f"{image['image_id']}.jpg"
+
+    def _download(self, image):
+        path = self._path(image)
+        if path.exists():
+            self.stats["disk_hits"] += 1
+            path.touch()
+        else:
+            self.client.download_url_to_file(image["quicklook_link"], path)
+            self.stats["downloads"] += 1
+            self._evict(keep=path)
+        return path
+
+    def _fetch(self, image):
+        """Future for the quicklook file, starting the download if needed"""
+        with self._lock:
+            future = self._pending.get(image["image_id"])
+            if future is None or (future.done() and future.exception()):
+                future = self._executor.submit(self._download, image)
+                self._pending[image["image_id"]] = future
+            return future
+
+    def prefetch(self, images):
+        for image in images:
+            self._fetch(image)
+
+    def get(self, image):
+        """Quicklook as a reduced-size RGB(A) array, decoded only once"""
+        image_id = image["image_id"]
+        with self._lock:
+            if image_id in self._arrays:
+                self._arrays.move_to_end(image_id)
+                self.stats["memory_hits"] += 1
+                return self._arrays[image_id]
+        path = self._fetch(image).result()
+        if not path.exists():
+            # Evicted before it was decoded; fetch it again
+            path = self._download(image)
+        array = self._plotting().open_image(path, self.max_size)
+        with self._lock:
+            self._pending.pop(image_id, None)
+            self._arrays[image_id] = array
+            while len(self._arrays) > self.max_memory:
+                self._arrays.popitem(last=False)
+        return array
+
+    def show(self, image, following=()):
+        """Plot a quicklook and prefetch the next few in `following`"""
+        self.prefetch(list(following)[: self.prefetch_count])
+        self._plotting().show_image(self.get(image))
+
+    def grid(self, images, columns=4, size=4, titles=True):
+        """One figure showing many candidates side by side"""
+        images = list(images)
+        self.prefetch(images)
+        labels = None
+        if titles:
+            labels = [
+                f"{image['acquisition_date'][:10]} cloud {image['cloud_cover']}%"
+                for image in images
+            ]
+        return self._plotting().show_grid(
+            [self.get(image) for image in images], labels, columns, size
+        )
+
+    @staticmethod
+    def _plotting():
+        # matplotlib and pillow are only loaded once something is decoded or shown
+        from . import plotting
+
+        return plotting
+
+    def _evict(self, keep=None):
+        """Remove least recently used files until under max_disk_bytes"""
+        with self._evict_lock:
+            files = [(p, p.stat()) for p in self.directory.glob("*.jpg")]
+            total = sum(stat.st_size for _, stat in files)
+            for path, stat in sorted(files, key=lambda item: item[1].st_mtime):
+                if total <= self.max_disk_bytes:
+                    break
+                if path != keep:
+                    path.unlink(missing_ok=True)
+                    total -= stat.st_size
@@ -0,0 +1,140 @@
+"""Pricing of planned orders, all at once, before any of them is placed"""
+
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+
+def quote_orders(client, orders, workers=8):
+    """Price every order concurrently
+
+    orders is a list of dicts with at least "ref" (the customerRef) and "body"
+    (the order body create_order would be sent); "site_ids" and "priority"
+    are used by apply_budget and cost_summary. Returns one dict per order, in
+    the same order, with price and currency added, or error if pricing failed
+    (one bad order doesn't stop the others being priced).
+    """
+
+    def quote(order):
+        try:
+            response = client.get_price(order["body"])
+        except Exception as e:
+            return dict(order, price=None, currency=None, error=repr(e))
+        return dict(
+            order,
+            price=response["price"],
+            currency=response.get("currency"),
+            error=None,
+        )
+
+    if not orders:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(orders)))) as pool:
+        return list(pool.map(quote, orders))
+
+
+def contract(quote):
+    """Contract an order is charged to, from its body (None for the account default)"""
+    return quote["body"].get("contractId")
+
+
+def apply_budget(quotes, budget=None):
+    """Split quotes into (accepted, rejected) so accepted ones cost at most budget
+
+    Orders are taken by priority (lowest first, e.g. each site's first choice
+    before any second choice), keeping list order on a tie, and skipped if
+    they would go over budget, so cheaper ones further down can still fit.
+    Unpriced orders are always rejected when there is a budget. Each quote
+    gets "accepted" set accordingly.
+    """
+    if budget is not None:
+        currencies = {q["currency"] for q in quotes if q["price"] is not None}
+        if len(currencies) > 1:
+            raise ValueError(
+                f"quotes in several currencies ({', '.join(map(str, currencies))}), "
+                "a single budget can't cover them"
+            )
+    accepted, rejected = [], []
+    spent = 0.0
+    for quote in sorted(quotes, key=lambda q: q.get("priority", 0)):
+        if budget is None:
+            ok = True
+        else:
+            ok = quote["price"] is not None and spent + quote["price"] <= budget
+        quote["accepted"] = ok
+        if ok:
+            spent += quote["price"] or 0
+            accepted.append(quote)
+        else:
+            rejected.append(quote)
+    return accepted, rejected
+
+
+def cost_summary(quotes):
+    """Total cost per (contract, currency) and per site, of priced quotes
+
+    An order shared by several sites is split evenly between them.
+    """
+    contracts = {}
+    sites = {}
+    for quote in quotes:
+        if quote["price"] is None:
+            continue
+        key = (contract(quote), quote["currency"])
+        totals = contracts.setdefault(key, {"orders": 0, "price": 0.0})
+        totals["orders"] += 1
+        totals["price"] += quote["price"]
+        site_ids = quote.get("site_ids") or [None]
+        for site_id in site_ids:
+            sites[site_id] = sites.get(site_id, 0.0) + quote["price"] / len(site_ids)
+    return {"contracts": contracts, "sites": sites}
+
+
+def format_cost_summary(summary, top=10):
+    """cost_summary() as text: totals per contract and the most expensive sites"""
+    lines = []
+    for (contract_id, currency), totals in sorted(
+        summary["contracts"].items(), key=lambda item: str(item[0])
+    ):
+        lines.append(
+            f"contract {contract_id or 'default'}: {totals['orders']} orders, "
+            f"{totals['price']:,.2f} {currency or ''}".rstrip()
+        )
+    costly = sorted(summary["sites"].items(), key=lambda item: -item[1])[:top]
+    if costly:
+        lines.append(
+            "most expensive sites: "
+            + ", ".join(f"{site_id} {price:,.2f}" for site_id, price in costly)
+        )
+    return "\n".join(lines)
+
+
+def write_quotes(quotes, path):
+    """One CSV row per order: ref, sites, image, price, currency, contract, accepted, error"""
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            [
+                "customer_ref",
+                "site_ids",
+                "image_id",
+                "price",
+                "currency",
+                "contract",
+                "accepted",
+                "error",
+            ]
+        )
+        for quote in quotes:
+            writer.writerow(
+                [
+                    quote["ref"],
+                    ",".join(str(s) for s in quote.get("site_ids") or []),
+                    quote.get("image_id"),
+                    quote["price"],
+                    quote["currency"],
+                    contract(quote),
+                    quote.get("accepted"),
+                    quote["error"],
+                ]
+            )
+    return path
@@ -0,0 +1,86 @@
+"""Raster post-processing of delivered images, requires rasterio"""
+
+import os
+from pathlib import Path
+
+import rasterio
+import rasterio.shutil
+from rasterio.io import MemoryFile
+from rasterio.mask import mask
+from rasterio.warp import transform_geom
+from shapely.geometry import mapping
+
+
+def _clip(src, geometry, geometry_crs):
+    """Pixels of an open dataset inside geometry, with the matching GTiff profile"""
+    if not isinstance(geometry, dict):
+        geometry = mapping(geometry)
+    geometry = transform_geom(geometry_crs, src.crs, geometry)
+    data, transform = mask(src, [geometry], crop=True)
+    profile = src.profile.copy()
+    profile.update(
+        driver="GTiff", height=data.shape[1], width=data.shape[2], transform=transform
+    )
+    return data, profile
+
+
+def clip_to_aoi(src_path, geometry, dst_path, geometry_crs="EPSG:4326"):
+    """Write the part of src_path inside geometry (shapely or GeoJSON) to dst_path"""
+    dst_path = Path(dst_path)
+    part_path = dst_path.with_name(dst_path.name + ".part")
+    with rasterio.open(src_path) as src:
+        data, profile = _clip(src, geometry, geometry_crs)
+        with rasterio.open(part_path, "w", **profile) as dst:
+            dst.write(data)
+    os.replace(part_path, dst_path)
+    return dst_path
+
+
+def is_cog(path, blocksize=512):
+    """True if path is already tiled, with internal overviews unless within a tile"""
+    with rasterio.open(path) as src:
+        small = max(src.width, src.height) <= blocksize
+        return bool(src.profile.get("tiled")) and (small or bool(src.overviews(1)))
+
+
+def to_cog(
+    src_path,
+    dst_path=None,
+    geometry=None,
+    geometry_crs="EPSG:4326",
+    compress="DEFLATE",
+    blocksize=512,
+    overview_resampling="AVERAGE",
+):
+    """Rewrite src_path as a Cloud Optimized GeoTIFF, optionally clipped to geometry
+
+    The COG is tiled, compressed and carries internal overviews, so reads at
+    reduced scale only touch the overview level they need. Without dst_path
+    the file is replaced in place, and left alone if it is already a COG.
+    """
+    src_path = Path(src_path)
+    dst_path = Path(dst_path) if dst_path else src_path
+    if geometry is None and dst_path == src_path and is_cog(src_path, blocksize):
+        return dst_path
+    part_path = dst_path.with_name(dst_path.name + ".part")
+    options = dict(
+        driver="COG",
+        COMPRESS=compress,
+        BLOCKSIZE=blocksize,
+        OVERVIEW_RESAMPLING=overview_resampling,
+        BIGTIFF="IF_SAFER",
+    )
+    if compress.upper() in ("DEFLATE", "LZW", "ZSTD"):
+        options["PREDICTOR"] = "YES"
+    with rasterio.open(src_path) as src:
+        if geometry is None:
+            rasterio.shutil.copy(src, part_path, **options)
+        else:
+            data, profile = _clip(src, geometry, geometry_crs)
+            # The COG driver only creates copies, so clip into memory first
+            with MemoryFile() as memfile:
+                with memfile.open(**profile) as clipped:
+                    clipped.write(data)
+                    rasterio.shutil.copy(clipped, part_path, **options)
+    os.replace(part_path, dst_path)
+    return dst_path
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: a shared state file is used without locking
+    fcntl = None
+
+
+class RateLimiter:
+    """Token buckets capping requests per second for each endpoint family
+
+    rates maps a family ("auth", "search", "data" or "download") to the
+    sustained requests per second allowed; families not in rates are not
+    limited. burst is how many requests a family may send at once after a
+    quiet spell (default one second's worth). acquire() reserves the next
+    token and sleeps until it is due, so concurrent threads are spaced out
+    instead of all hitting a 429 and backing off.
+
+    With lock_path set the buckets live in that file under an exclusive lock,
+    so every process given the same path shares one budget.
+    """
+
+    FAMILIES = ("auth", "search", "data", "download")
+
+    def __init__(
+        self, rates, burst=None, lock_path=None, sleep=time.sleep, clock=time.time
+    ):
+        unknown = set(rates) - set(self.FAMILIES)
+        if unknown:
+            raise ValueError(
+                f"unknown families {', '.join(sorted(unknown))}, expected {self.FAMILIES}"
+            )
+        self.rates = {family: rate for family, rate in rates.items() if rate}
+        burst = burst or {}
+        self.burst = {
+            family: burst.get(family, max(1.0, rate))
+            for family, rate in self.rates.items()
+        }
+        self.lock_path = Path(lock_path) if lock_path else None
+        self._sleep = sleep
+        self._clock = clock
+        # family -> [tokens, time last updated]; tokens go negative when reserved ahead
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            family: {"requests": 0, "waits": 0, "wait_seconds": 0.0}
+            for family in self.rates
+        }
+
+    def acquire(self, family):
+        """Wait until a request in `family` may be sent; returns the seconds waited"""
+        rate = self.rates.get(family)
+        if rate is None:
+            return 0.0
+        with self._lock:
+            if self.lock_path is None:
+                delay = self._take(self._buckets, family, rate)
+            else:
+                delay = self._take_shared(family, rate)
+            stats = self.stats[family]
+            stats["requests"] += 1
+            if delay > 0:
+                stats["waits"] += 1
+                stats["wait_seconds"] += delay
+        if delay > 0:
+            self._sleep(delay)
+        return delay
+
+    def _take(self, buckets, family, rate):
+        now = self._clock()
+        burst = self.burst[family]
+        tokens, updated = buckets.get(family, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate) - 1
+        buckets[family] = [tokens, now]
+        return max(0.0, -tokens / rate)
+
+    def _take_shared(self, family, rate):
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with open(fd, "r+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                buckets = json.load(f)
+            except ValueError:
+                buckets = {}
+            delay = self._take(buckets, family, rate)
+            f.seek(0)
+            f.truncate()
+            json.dump(buckets, f)
+        return delay
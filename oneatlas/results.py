@@ -0,0 +1,220 @@
+"""Columnar store of search results for filtering and persisting scene catalogues"""
+
+import threading
+
+import numpy as np
+import shapely
+import shapely.geometry
+
+# column -> (opensearch property, dtype) for the typed columns
+COLUMNS = {
+    "image_id": ("id", object),
+    "acquisition_date": ("acquisitionDate", "datetime64[ms]"),
+    "constellation": ("constellation", object),
+    "cloud_cover": ("cloudCover", float),
+    "incidence_angle": ("incidenceAngle", float),
+}
+
+
+def _column(values, dtype):
+    if dtype == "datetime64[ms]":
+        # numpy won't parse the trailing Z itself
+        values = [v[:-1] if v and v.endswith("Z") else v for v in values]
+        return np.array(values, dtype="datetime64[ms]")
+    if dtype is float:
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    # fromiter keeps list/dict values as single objects rather than new dimensions
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+class SceneTable:
+    """Scene metadata from any number of searches as NumPy columns plus geometry
+
+    All feature properties are kept: the common ones as typed columns (see
+    COLUMNS), every other property as an object column, along with the
+    quicklook link and footprint (a shapely array in EPSG:4326). Tables are
+    independent of the client, so each thread can build its own, and append
+    is thread-safe.
+
+        table = SceneTable()
+        for body in bodies:
+            table.append(client.search(body))
+        recent = table.filter(table["cloud_cover"] < 10).sort("acquisition_date", descending=True)
+        recent.to_parquet("scenes.parquet")
+    """
+
+    def __init__(self, columns=None, geometry=None):
+        self._columns = dict(columns or {})
+        self.geometry = (
+            np.asarray(geometry, dtype=object)
+            if geometry is not None
+            else np.empty(0, dtype=object)
+        )
+        self._chunks = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_results(cls, results):
+        table = cls()
+        table.append(results)
+        return table
+
+    def append(self, results):
+        """Add the features of a search response"""
+        features = results["features"]
+        if not features:
+            return self
+        properties = [f["properties"] for f in features]
+        columns = {
+            name: _column([p.get(key) for p in properties], dtype)
+            for name, (key, dtype) in COLUMNS.items()
+        }
+        columns["quicklook_link"] = _column(
+            [f.get("_links", {}).get("quicklook", {}).get("href") for f in features],
+            object,
+        )
+        typed = {key for key, _ in COLUMNS.values()}
+        extra = {key for p in properties for key in p} - typed
+        for key in sorted(extra):
+            columns[key] = _column([p.get(key) for p in properties], object)
+        geometry = _column(
+            [shapely.geometry.shape(f["geometry"]) for f in features], object
+        )
+        with self._lock:
+            self._chunks.append((columns, geometry))
+        return self
+
+    def _consolidate(self):
+        with self._lock:
+            if not self._chunks:
+                return
+            chunks = [(self._columns, self.geometry)] + self._chunks
+            self._chunks = []
+            lengths = [len(geometry) for _, geometry in chunks]
+            names = list(
+                dict.fromkeys(name for columns, _ in chunks for name in columns)
+            )
+            merged = {}
+            for name in names:
+                parts = []
+                for (columns, _), length in zip(chunks, lengths):
+                    if name in columns:
+                        parts.append(columns[name])
+                    else:
+                        dtype = COLUMNS.get(name, (None, object))[1]
+                        parts.append(_column([None] * length, dtype))
+                merged[name] = np.concatenate(parts)
+            self._columns = merged
+            self.geometry = np.concatenate([geometry for _, geometry in chunks])
+
+    def __len__(self):
+        self._consolidate()
+        return len(self.geometry)
+
+    def __getitem__(self, name):
+        self._consolidate()
+        return self._columns[name]
+
+    @property
+    def columns(self):
+        self._consolidate()
+        return list(self._columns)
+
+    def take(self, indices):
+        """New table of the rows at indices (an index array or boolean mask)"""
+        self._consolidate()
+        return SceneTable(
+            {name: values[indices] for name, values in self._columns.items()},
+            self.geometry[indices],
+        )
+
+    def filter(self, mask):
+        return self.take(np.asarray(mask, dtype=bool))
+
+    def sort(self, by, descending=False):
+        order = np.argsort(self[by], kind="stable")
+        return self.take(order[::-1] if descending else order)
+
+    def drop_duplicates(self, column="image_id"):
+        """Keep the first row for each value of column"""
+        _, first = np.unique(self[column].astype(str), return_index=True)
+        return self.take(np.sort(first))
+
+    def containing(self, geometry):
+        """Rows whose footprint contains geometry (shapely, EPSG:4326)"""
+        self._consolidate()
+        return self.filter(shapely.contains(self.geometry, geometry))
+
+    def records(self):
+        """Rows as dicts, in the same shape as OneAtlasClient.parse_results"""
+        self._consolidate()
+        dates = np.datetime_as_string(self._columns["acquisition_date"], "ms")
+        return [
+            {
+                "image_id": image_id,
+                "quicklook_link": quicklook_link,
+                "acquisition_date": date + "Z",
+                "constellation": constellation,
+                "cloud_cover": cloud_cover,
+                "incidence_angle": incidence_angle,
+                "geometry": shapely.geometry.mapping(geometry),
+            }
+            for image_id, quicklook_link, date, constellation, cloud_cover, incidence_angle, geometry in zip(
+                self._columns["image_id"].tolist(),
+                self._columns["quicklook_link"].tolist(),
+                dates.tolist(),
+                self._columns["constellation"].tolist(),
+                self._columns["cloud_cover"].tolist(),
+                self._columns["incidence_angle"].tolist(),
+                self.geometry,
+            )
+        ]
+
+    def to_geodataframe(self):
+        import geopandas as gpd
+
+        self._consolidate()
+        return gpd.GeoDataFrame(self._columns, geometry=self.geometry, crs="EPSG:4326")
+
+    @classmethod
+    def from_geodataframe(cls, gdf):
+        gdf = gdf.to_crs(epsg=4326)
+        columns = {
+            name: gdf[name].to_numpy()
+            for name in gdf.columns
+            if name != gdf.geometry.name
+        }
+        if "acquisition_date" in columns:
+            columns["acquisition_date"] = columns["acquisition_date"].astype(
+                "datetime64[ms]"
+            )
+        return cls(columns, gdf.geometry.to_numpy())
+
+    def to_parquet(self, path):
+        self._stringify(self.to_geodataframe()).to_parquet(path)
+
+    @classmethod
+    def read_parquet(cls, path):
+        import geopandas as gpd
+
+        return cls.from_geodataframe(gpd.read_parquet(path))
+
+    def to_file(self, path, layer="scenes", driver="GPKG"):
+        self._stringify(self.to_geodataframe()).to_file(
+            path, layer=layer, driver=driver
+        )
+
+    @classmethod
+    def read_file(cls, path, layer="scenes"):
+        import geopandas as gpd
+
+        return cls.from_geodataframe(gpd.read_file(path, layer=layer))
+
+    @staticmethod
+    def _stringify(gdf):
+        # Nested properties (lists/dicts) don't fit file formats, store them as text
+        for name in gdf.columns:
+            if gdf[name].dtype == object and name != gdf.geometry.name:
+                if gdf[name].map(lambda v: isinstance(v, (list, dict))).any():
+                    gdf[name] = gdf[name].map(lambda v: None if v is None else str(v))
+        return gdf
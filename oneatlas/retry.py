@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter shared by every request a client makes
+
+    A request is retried on connection errors and on retryable statuses
+    (429 and 5xx by default), but only if the method is idempotent or the call
+    is flagged idempotent (e.g. the search and price POSTs). Non-idempotent
+    calls such as create_order are only retried if the connection could not be
+    made at all, so an order is never sent twice. A Retry-After header on the
+    response overrides the computed backoff.
+
+    call() runs the loop for requests; other transports (the asyncio client)
+    drive the same decisions with should_retry() and next_delay().
+    """
+
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        max_attempts=5,
+        backoff_factor=1.0,
+        max_backoff=60.0,
+        jitter=True,
+        retry_statuses=RETRY_STATUSES,
+        respect_retry_after=True,
+        sleep=time.sleep,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "retried_statuses": {},
+            "connection_errors": 0,
+            "gave_up": 0,
+            "backoff_seconds": 0.0,
+        }
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (starting at 1)"""
+        if response is not None and self.respect_retry_after:
+            retry_after = self._retry_after(response)
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            # "Full jitter" so parallel workers don't retry in lockstep
+            delay = random.uniform(0, delay)
+        return delay
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    @staticmethod
+    def never_sent(error):
+        """True if a requests connection error happened before anything was sent"""
+        # A failed connect never reached the server so is always safe to retry
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def should_retry(self, outcome, idempotent, attempt, never_sent=None):
+        """Whether to send a request again after attempt number `attempt`
+
+        outcome is the response status code or the connection error raised;
+        never_sent says whether that error came before anything reached the
+        server (worked out with never_sent() for requests errors if not
+        given). Running out of attempts, or a connection error that can't be
+        retried, is counted in stats["gave_up"].
+        """
+        if isinstance(outcome, BaseException):
+            if never_sent is None:
+                never_sent = self.never_sent(outcome)
+            if not (idempotent or never_sent):
+                self.record("gave_up")
+                return False
+        elif outcome not in self.retry_statuses or not idempotent:
+            return False
+        if attempt >= self.max_attempts:
+            self.record("gave_up")
+            return False
+        return True
+
+    def next_delay(self, attempt, outcome, response=None):
+        """Backoff before retrying after `outcome` (status or error), counted in stats"""
+        delay = self.backoff(attempt, response)
+        if isinstance(outcome, BaseException):
+            self.record("connection_errors")
+            self.record("retries", delay=delay)
+        else:
+            self.record("retries", status=outcome, delay=delay)
+        return delay
+
+    def record(self, key, status=None, delay=0.0):
+        """Add one to stats[key] (and to the count for a retried status)"""
+        with self._lock:
+            if key is not None:
+                self.stats[key] += 1
+            if status is not None:
+                statuses = self.stats["retried_statuses"]
+                statuses[status] = statuses.get(status, 0) + 1
+            self.stats["backoff_seconds"] += delay
+
+    def call(self, send, method, idempotent=None):
+        """Call send() until it returns a non-retryable response or attempts run out
+
+        The last response is returned as is, so callers still decide when to
+        raise_for_status().
+        """
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        self.record("requests")
+        attempt = 1
+        while True:
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not self.should_retry(e, idempotent, attempt):
+                    raise
+                outcome, response = e, None
+            else:
+                outcome = response.status_code
+                if not self.should_retry(outcome, idempotent, attempt):
+                    return response
+                response.close()
+            self._sleep(self.next_delay(attempt, outcome, response))
+            attempt += 1
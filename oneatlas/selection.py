@@ -0,0 +1,101 @@
+"""Ranking and top-k selection of search results (as returned by parse_results)
+
+Rankings are key functions where lower is better. Acquisition dates are
+compared as ISO 8601 strings, which sort chronologically as they are, so
+nothing is parsed unless a recency window or age weighting needs it.
+
+    best = select_images(images, k=3, key=weighted(cloud_cover=1, incidence_angle=0.5))
+"""
+
+import heapq
+from datetime import datetime, timedelta, timezone
+
+import shapely
+from shapely.geometry import shape
+
+
+class _Descending:
+    """Wraps a value so that larger values sort first"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def newest(image):
+    return _Descending(image["acquisition_date"])
+
+
+def cloud_cover(image):
+    return image["cloud_cover"]
+
+
+def incidence_angle(image):
+    return image["incidence_angle"]
+
+
+def acquired_at(image):
+    return datetime.fromisoformat(image["acquisition_date"].replace("Z", "+00:00"))
+
+
+def coverage_fraction(image, aoi):
+    """Share of the aoi (shapely, EPSG:4326) inside the image footprint"""
+    footprint = shape(image["geometry"])
+    return shapely.area(shapely.intersection(footprint, aoi)) / shapely.area(aoi)
+
+
+def within_days(days, now=None):
+    """Predicate keeping images acquired in the last `days` days"""
+    now = now or datetime.now(timezone.utc)
+    # ISO strings compare directly, so the cutoff is formatted once
+    cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return lambda image: image["acquisition_date"] >= cutoff
+
+
+def weighted(
+    cloud_cover=1.0, incidence_angle=0.0, age_days=0.0, coverage=0.0, aoi=None, now=None
+):
+    """Key scoring images on a weighted sum of properties, lower is better
+
+    Each unit of cloud cover (%) or incidence angle (degrees) or day of age
+    costs its weight; coverage rewards the percentage of aoi the footprint
+    covers. Properties with zero weight are never read.
+    """
+    now = now or datetime.now(timezone.utc)
+    if coverage and aoi is None:
+        raise ValueError("an aoi is needed to weight by coverage")
+
+    def score(image):
+        total = 0.0
+        if cloud_cover:
+            total += cloud_cover * image["cloud_cover"]
+        if incidence_angle:
+            total += incidence_angle * image["incidence_angle"]
+        if age_days:
+            total += age_days * (now - acquired_at(image)).total_seconds() / 86400
+        if coverage:
+            total -= coverage * 100 * coverage_fraction(image, aoi)
+        return total
+
+    return score
+
+
+def select_images(images, k=1, key=cloud_cover, where=None):
+    """The k best images by key in one pass, ties kept in input order
+
+    where is an optional predicate filtering images first (e.g. within_days).
+    """
+    if where is not None:
+        images = filter(where, images)
+    if k == 1:
+        # min() is a single pass with no heap and returns the first of any ties
+        best = min(images, key=key, default=None)
+        return [] if best is None else [best]
+    return heapq.nsmallest(k, images, key=key)
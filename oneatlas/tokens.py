@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: the token cache file is used without locking
+    fcntl = None
+
+
+class TokenManager:
+    """Thread-safe access tokens that are refreshed before they expire
+
+    fetch(client_id) performs the actual authentication and returns the token
+    response ({"access_token": ..., "expires_in": ...}). A token is treated as
+    expired refresh_margin seconds early. Concurrent callers needing a new
+    token wait on one refresh per client id instead of all authenticating.
+
+    With background=True a daemon thread renews tokens shortly before the
+    margin so requests never wait on authentication. With cache_path set,
+    tokens are shared through a locked JSON file so worker processes reuse
+    one another's tokens rather than each authenticating.
+    """
+
+    def __init__(
+        self, fetch, refresh_margin=60, cache_path=None, cache_key="", background=False
+    ):
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.cache_path = Path(cache_path) if cache_path else None
+        # Tokens for different api keys sharing a cache file must not mix
+        self._cache_prefix = hashlib.sha256(cache_key.encode()).hexdigest()[:16]
+        self._tokens = {}
+        # access token -> client id, to tell which client a refused token was for
+        self._issued = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "auth_requests": 0,
+            "auth_seconds": 0.0,
+            "cache_hits": 0,
+            "background_refreshes": 0,
+            "failed_refreshes": 0,
+        }
+        if background:
+            self.start()
+
+    def headers(self, client_id):
+        return {"Authorization": "Bearer " + self.token(client_id)["access_token"]}
+
+    def token(self, client_id):
+        token = self._tokens.get(client_id)
+        if self._fresh(token):
+            return token
+        with self._lock(client_id):
+            # Another thread may have refreshed while we waited for the lock
+            token = self._tokens.get(client_id)
+            if not self._fresh(token):
+                token, _ = self._refresh(client_id)
+            return token
+
+    def invalidate(self, client_id, access_token=None):
+        """Forget the client's token (only if it is still access_token, when given)
+
+        It is also removed from the shared cache, so no process picks it up again.
+        """
+        with self._lock(client_id):
+            token = self._tokens.get(client_id)
+            if token is not None and access_token in (None, token["access_token"]):
+                del self._tokens[client_id]
+                access_token = token["access_token"]
+            if access_token is not None:
+                self._drop_cached(client_id, access_token)
+
+    def reject(self, headers):
+        """Invalidate the token sent in these headers after the server refused it
+
+        Returns its client id, so the caller can retry with fresh headers, or
+        None if the headers carry no token issued here.
+        """
+        authorization = (headers or {}).get("Authorization", "")
+        access_token = authorization.removeprefix("Bearer ")
+        client_id = self._issued.get(access_token)
+        if client_id is not None:
+            self.invalidate(client_id, access_token)
+        return client_id
+
+    def _fresh(self, token, margin=None):
+        if token is None:
+            return False
+        margin = self.refresh_margin if margin is None else margin
+        return token["expires_at"] - margin > time.time()
+
+    def _lock(self, client_id):
+        with self._locks_lock:
+            return self._locks.setdefault(client_id, threading.Lock())
+
+    def _refresh(self, client_id, margin=None):
+        """Install a token from the cache, or a new one, fresh by margin
+
+        Returns (token, True if it had to be fetched).
+        """
+        token = self._read_cache(client_id)
+        fetched = not self._fresh(token, margin)
+        if not fetched:
+            self.stats["cache_hits"] += 1
+        else:
+            start = time.perf_counter()
+            response = self.fetch(client_id)
+            self.stats["auth_requests"] += 1
+            self.stats["auth_seconds"] += time.perf_counter() - start
+            token = {
+                "access_token": response["access_token"],
+                "expires_at": time.time() + response["expires_in"],
+            }
+            self._write_cache(client_id, token)
+        self._issued[token["access_token"]] = client_id
+        self._tokens[client_id] = token
+        return token, fetched
+
+    def _read_cache(self, client_id):
+        if self.cache_path is None or not self.cache_path.exists():
+            return None
+        with open(self.cache_path, "r") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                cache = json.load(f)
+            except ValueError:
+                return None
+        return cache.get(f"{self._cache_prefix}:{client_id}")
+
+    def _write_cache(self, client_id, token):
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.cache_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with open(fd, "r+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                cache = json.load(f)
+            except ValueError:
+                cache = {}
+            now = time.time()
+            cache = {k: v for k, v in cache.items() if v["expires_at"] > now}
+            cache[f"{self._cache_prefix}:{client_id}"] = token
+            f.seek(0)
+            f.truncate()
+            json.dump(cache, f)
+
+    def _drop_cached(self, client_id, access_token):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        with open(self.cache_path, "r+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                cache = json.load(f)
+            except ValueError:
+                return
+            key = f"{self._cache_prefix}:{client_id}"
+            if cache.get(key, {}).get("access_token") != access_token:
+                return
+            del cache[key]
+            f.seek(0)
+            f.truncate()
+            json.dump(cache, f)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Renew a little before foreground callers would have to. A cached
+            # token is only taken if it is fresh by the same margin, or one
+            # that merely passes the foreground check would be kept until a
+            # request had to renew it.
+            margin = 2 * self.refresh_margin
+            for client_id in list(self._tokens):
+                if not self._fresh(self._tokens.get(client_id), margin):
+                    try:
+                        with self._lock(client_id):
+                            if self._fresh(self._tokens.get(client_id), margin):
+                                continue
+                            _, fetched = self._refresh(client_id, margin)
+                        if fetched:
+                            self.stats["background_refreshes"] += 1
+                    except Exception:
+                        # Foreground calls will retry and surface the error
+                        self.stats["failed_refreshes"] += 1
+            self._stop.wait(min(5, self.refresh_margin / 2))